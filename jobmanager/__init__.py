@@ -36,6 +36,7 @@ from . import clients
 from . import decorators
 from . import progress
 from . import servers
+from . import sinks
 from . import ode_wrapper
 
 # persistentData requires sqlitedict
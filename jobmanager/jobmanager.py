@@ -30,8 +30,11 @@ The class JobManager_Client
 """
 from __future__ import division, print_function
 
+import collections
 import copy
 import functools
+import hashlib
+import heapq
 import inspect
 import multiprocessing as mp
 from multiprocessing.managers import BaseManager, RemoteError
@@ -41,6 +44,7 @@ import pickle
 import signal
 import socket
 import sys
+import threading
 import time
 import traceback
 
@@ -49,6 +53,14 @@ import traceback
 __all__ = ["JobManager_Client",
            "JobManager_Local",
            "JobManager_Server",
+           "JobFetcher",
+           "JobQueue",
+           "FailureLog",
+           "RetryPolicy",
+           "ResultBuffer",
+           "IndexSet",
+           "ParameterSweep",
+           "SweepArg",
            "hashDict",
            "hashableCopyOfNumpyArray",
            "getDateForFileName"
@@ -87,6 +99,19 @@ else:
     JMConnectionRefusedError = ConnectionRefusedError
     JMConnectionResetError = ConnectionResetError
     
+# the processing pool of the server (see JobManager_Server.prepare_new_result)
+# requires the 'futures' backport on Python 2
+try:
+    import concurrent.futures as futures
+except ImportError:
+    futures = None
+
+# wait on several queues at once, not available on Python 2
+try:
+    from multiprocessing.connection import wait as mp_connection_wait
+except ImportError:
+    mp_connection_wait = None
+    
 
 
 sys.path.append(os.path.dirname(__file__))
@@ -105,8 +130,8 @@ class JobManager_Client(object):
     SyncManager setup by the JobManager_Server. 
     
     Spawns nproc subprocesses (__worker_func) to process arguments. 
-    Each subprocess gets an argument from the job_q, processes it 
-    and puts the result to the result_q.
+    Each subprocess gets an argument (or a batch of arguments, see batch_size)
+    from the job_q, processes it and puts the result to the result_q.
     
     If the job_q is empty, terminate the subprocess.
     
@@ -121,6 +146,11 @@ class JobManager_Client(object):
     Then the process will terminate.
     """
     
+    # used for batch_size='auto': target calculation time of a single batch
+    # and the maximum number of arguments fetched at once
+    BATCH_TIME = 1.
+    BATCH_SIZE_MAX = 1000
+    
     def __init__(self, 
                   server, 
                   authkey, 
@@ -132,7 +162,12 @@ class JobManager_Client(object):
                   verbose=1,
                   show_statusbar_for_jobs=True,
                   show_counter_only=False,
-                  interval=0.3):
+                  interval=0.3,
+                  batch_size=1,
+                  result_batch_size=1,
+                  result_batch_bytes=None,
+                  result_batch_time=None,
+                  prefetch=0):
         """
         server [string] - ip address or hostname where the JobManager_Server is running
         
@@ -162,6 +197,40 @@ class JobManager_Client(object):
         no_warnings [bool] - call warnings.filterwarnings("ignore") -> all warnings are ignored
         
         verbose [int] - 0: quiet, 1: status only, 2: debug messages
+        
+        batch_size [integer/'auto'] - number of arguments a subprocess fetches from
+        the job_q with a single request (see JobQueue.get_many)
+        
+            positive integer: fetch up to batch_size arguments at once
+            
+            'auto': adapt the number of arguments to the measured calculation
+                    time such that one batch takes about BATCH_TIME seconds
+                    (but at most BATCH_SIZE_MAX arguments)
+        
+            For very short jobs fetching a whole batch avoids most of the
+            communication overhead, but note that the arguments of a batch
+            are held by the subprocess until they are processed.
+        
+        result_batch_size [integer] - number of results a subprocess collects before
+        sending them to the result_q as a single list (see ResultBuffer)
+        
+        result_batch_bytes [integer/None] - send the collected results as soon as
+        their (estimated) size exceeds that many bytes (None: no size limit)
+        
+        result_batch_time [float/None] - send the collected results as soon as the
+        oldest one has been waiting for that many seconds (None: no time limit)
+        
+            Collected results are always sent when the subprocess finishes.
+        
+        prefetch [integer] - number of arguments each subprocess tries to keep ready
+        while calculating
+        
+            zero: fetch the next argument (or batch of arguments) only when 
+                  the previous one has been processed
+            
+            positive integer: a background thread fetches the arguments and
+                  an other one sends the results, so the communication with
+                  the server overlaps with the calculation (see JobFetcher)
         """
         
         self.show_statusbar_for_jobs = show_statusbar_for_jobs
@@ -197,6 +266,17 @@ class JobManager_Client(object):
         if njobs == 0:
             njobs -= 1
         self.njobs = njobs
+        if (batch_size != 'auto') and (batch_size < 1):
+            raise ValueError("batch_size must be a positive integer or 'auto' (got {})".format(batch_size))
+        self.batch_size = batch_size
+        if result_batch_size < 1:
+            raise ValueError("result_batch_size must be a positive integer (got {})".format(result_batch_size))
+        self.result_batch_size = result_batch_size
+        self.result_batch_bytes = result_batch_bytes
+        self.result_batch_time = result_batch_time
+        if prefetch < 0:
+            raise ValueError("prefetch must not be negative (got {})".format(prefetch))
+        self.prefetch = prefetch
         
         self.procs = []
         
@@ -299,7 +379,30 @@ class JobManager_Client(object):
             traceback.print_exc()
 
     @staticmethod
-    def __worker_func(func, nice, verbose, server, port, authkey, i, manager_objects, c, m, reset_pbc, njobs):
+    def _put_back_args(job_q, args, verbose, identifier):
+        if verbose > 1:
+            print("{}: try to put {} arg(s) back to job_q ...".format(identifier, len(args)), end='')
+            sys.stdout.flush()
+        try:
+            job_q.put_back(args)
+        # handle SystemExit in outer try ... except                        
+        except SystemExit as e:
+            if verbose > 1:
+                print(" FAILED!")
+            raise e
+        # job_q.put failed -> server down?             
+        except Exception as e:
+            if verbose > 1:
+                print(" FAILED!")
+            JobManager_Client._handle_unexpected_queue_error(e, verbose, identifier)
+        else:
+            if verbose > 1:
+                print(" done!")
+
+    @staticmethod
+    def __worker_func(func, nice, verbose, server, port, authkey, i, manager_objects, c, m, reset_pbc, njobs, 
+                      batch_size=1, result_batch_size=1, result_batch_bytes=None, result_batch_time=None,
+                      prefetch=0):
         """
         the wrapper spawned nproc trimes calling and handling self.func
         """
@@ -347,14 +450,8 @@ class JobManager_Client(object):
                 print("{}: found standard keyword arguments: [c, m]".format(identifier))
             _func = func
             
-        job_q_get    = proxy_operation_decorator(proxy           = job_q,
-                                                 operation       = 'get',
-                                                 verbose         = verbose, 
-                                                 identifier      = identifier, 
-                                                 reconnect_wait  = 2, 
-                                                 reconnect_tries = 3)
-        job_q_put    = proxy_operation_decorator(proxy           = job_q,
-                                                 operation       = 'put',
+        job_q_get_many = proxy_operation_decorator(proxy           = job_q,
+                                                   operation       = 'get_many',
                                                  verbose         = verbose, 
                                                  identifier      = identifier, 
                                                  reconnect_wait  = 2, 
@@ -365,6 +462,12 @@ class JobManager_Client(object):
                                                  identifier      = identifier, 
                                                  reconnect_wait  = 2, 
                                                  reconnect_tries = 3)
+        job_q_release = proxy_operation_decorator(proxy          = job_q,
+                                                  operation      = 'release',
+                                                  verbose        = verbose, 
+                                                  identifier     = identifier, 
+                                                  reconnect_wait  = 2, 
+                                                  reconnect_tries = 3)
         fail_q_put   = proxy_operation_decorator(proxy           = fail_q,
                                                  operation       = 'put',
                                                  verbose         = verbose, 
@@ -372,6 +475,31 @@ class JobManager_Client(object):
                                                  reconnect_wait  = 2, 
                                                  reconnect_tries = 3)        
         
+        # with prefetch enabled, the results are sent by a background thread
+        result_buffer = ResultBuffer(put        = result_q_put,
+                                     max_count  = result_batch_size,
+                                     max_bytes  = result_batch_bytes,
+                                     max_time   = result_batch_time,
+                                     threaded   = prefetch > 0)
+        
+        if batch_size == 'auto':
+            n_batch = 1
+        else:
+            n_batch = batch_size
+        # the fetched arguments are leased to this worker (if the server
+        # uses leases, see JobQueue), the client confirms that we are alive
+        owner = (socket.gethostname(), os.getpid())
+        
+        # provides the arguments, fetched in a background thread if prefetch > 0
+        job_fetcher = JobFetcher(get_many = functools.partial(job_q_get_many, owner=owner),
+                                 n_batch  = n_batch,
+                                 prefetch = prefetch,
+                                 max_jobs = njobs)
+        # the argument currently processed, None if there is no such argument
+        arg = None
+        # the signatures of the tracebacks sent to the server so far
+        sent_signatures = set()
+        
         # supposed to catch SystemExit, which will shut the client down quietly 
         try:
             
@@ -383,10 +511,14 @@ class JobManager_Client(object):
             while njobs != 0:
                 njobs -= 1
 
-                # try to get an item from the job_q                
+                if batch_size == 'auto' and cnt > 0 and time_calc > 0:
+                    n_batch = int(JobManager_Client.BATCH_TIME * cnt / time_calc)
+                    job_fetcher.n_batch = max(1, min(n_batch, JobManager_Client.BATCH_SIZE_MAX))
+
+                # try to get an item from the job_q (see JobFetcher)
                 try:
                     tg_0 = time.time()
-                    arg = job_q_get(block = True, timeout = 0.1)
+                    arg = job_fetcher.get()
                     tg_1 = time.time()
                     time_queue += (tg_1-tg_0)
                  
@@ -413,35 +545,30 @@ class JobManager_Client(object):
                 except SystemExit as e:
                     raise e
                 # something went wrong while doing the actual calculation
-                # - write traceback to file
-                # - try to inform the server of the failure
+                # - try to inform the server of the failure, including the traceback
                 except:
                     err, val, trb = sys.exc_info()
                     if verbose > 0:
-                        print("{}: caught exception '{}'".format(identifier, err.__name__))
+                        print("{}: caught exception '{}', continue processing next argument".format(identifier, err.__name__))
                     
                     if verbose > 1:
                         traceback.print_exc()
                 
-                    # write traceback to file
                     hostname = socket.gethostname()
-                    fname = 'traceback_err_{}_{}.trb'.format(err.__name__, getDateForFileName(includePID=True))
-                        
-                    if verbose > 0:
-                        print("        write exception to file {} ... ".format(fname), end='')
-                        sys.stdout.flush()
-                    with open(fname, 'w') as f:
-                        traceback.print_exception(etype=err, value=val, tb=trb, file=f)
-                    if verbose > 0:
-                        print("done")
-                        print("        continue processing next argument.")
+                    signature, trb_text = traceback_with_signature(err, val, trb)
+                    del trb
+                    # the same traceback is sent only once
+                    if signature in sent_signatures:
+                        trb_text = None
                         
                     # try to inform the server of the failure
                     if verbose > 1:
                         print("{}: try to send send failed arg to fail_q ...".format(identifier), end='')
                         sys.stdout.flush()
                     try:
-                        fail_q_put((arg, err.__name__, hostname), timeout=10)
+                        fail_q_put((arg, err.__name__, hostname, signature, trb_text), timeout=10)
+                        sent_signatures.add(signature)
+                        job_q_release([arg])
                     # handle SystemExit in outer try ... except                        
                     except SystemExit as e:
                         if verbose > 1:
@@ -462,7 +589,7 @@ class JobManager_Client(object):
                 else:
                     try:
                         tp_0 = time.time()
-                        result_q_put((arg, res))
+                        result_buffer.put(arg, res)
                         tp_1 = time.time()
                         time_queue += (tp_1-tp_0)
                         
@@ -473,28 +600,42 @@ class JobManager_Client(object):
                     except Exception as e:
                         JobManager_Client._handle_unexpected_queue_error(e, verbose, identifier)
                         break
-                    
+                
+                arg = None
                 cnt += 1
                 reset_pbc()
+            
+            # send the results still held by the result_buffer
+            try:
+                tp_0 = time.time()
+                result_buffer.close()
+                tp_1 = time.time()
+                time_queue += (tp_1-tp_0)
+            # handle SystemExit in outer try ... except
+            except SystemExit as e:
+                raise e
+            except Exception as e:
+                JobManager_Client._handle_unexpected_queue_error(e, verbose, identifier)
+            
+            # the job_fetcher might hold some prefetched arguments
+            unprocessed_args = job_fetcher.stop()
+            if len(unprocessed_args) > 0:
+                JobManager_Client._put_back_args(job_q, unprocessed_args, verbose, identifier)
              
         # considered as normal exit caused by some user interaction, SIGINT, SIGTERM
         # note SIGINT, SIGTERM -> SystemExit is achieved by overwriting the
         # default signal handlers
         except SystemExit:
-            if verbose > 0:
-                print("{}: SystemExit, quit processing, reinsert current argument".format(identifier))
-
+            # results already calculated should not get lost
             if verbose > 1:
-                print("{}: try to put arg back to job_q ...".format(identifier), end='')
+                print("{}: try to send the collected results to result_q ...".format(identifier), end='')
                 sys.stdout.flush()
             try:
-                job_q.put(arg, timeout=10)
-            # handle SystemExit in outer try ... except                        
+                result_buffer.close()
             except SystemExit as e:
                 if verbose > 1:
                     print(" FAILED!")
                 raise e
-            # fail_q.put failed -> server down?             
             except Exception as e:
                 if verbose > 1:
                     print(" FAILED!")
@@ -502,6 +643,20 @@ class JobManager_Client(object):
             else:
                 if verbose > 1:
                     print(" done!")
+            
+            unprocessed_args = job_fetcher.stop()
+            if arg is not None:
+                unprocessed_args.insert(0, arg)
+            if verbose > 0:
+                print("{}: SystemExit, quit processing, reinsert {} unprocessed argument(s)".format(identifier, len(unprocessed_args)))
+            JobManager_Client._put_back_args(job_q, unprocessed_args, verbose, identifier)
+                
+        # all results have been sent, all unprocessed args have been put back
+        try:
+            job_q.release_owner(owner)
+        except Exception as e:
+            if verbose > 1:
+                print("{}: could not release the leases: {}".format(identifier, e))
                 
         if verbose > 0:
             try:
@@ -512,6 +667,21 @@ class JobManager_Client(object):
         if verbose > 1:
             print("{}: JobManager_Client.__worker_func at end (PID {})".format(identifier, os.getpid()))
 
+    def _heartbeat(self, job_q):
+        """tell the server that the (still running) workers are alive"""
+        hostname = socket.gethostname()
+        owners = [(hostname, p.pid) for p in self.procs if p.is_alive()]
+        try:
+            job_q.heartbeat(owners)
+        except Exception as e:
+            if self.verbose > 0:
+                print("{}: sending heartbeat failed: {}".format(self._identifier, e))
+                
+    def _heartbeat_loop(self, job_q, interval, stop):
+        """send a heartbeat every interval seconds until stop is set"""
+        while not stop.wait(interval):
+            self._heartbeat(job_q)
+        
     def start(self):
         """
         starts a number of nproc subprocess to work on the job_q
@@ -562,6 +732,23 @@ class JobManager_Client(object):
                       sigint    = 'ign',
                       sigterm   = 'ign' ) as self.pbc :
             self.pbc.start()
+            
+            # if the server uses leases, confirm regularly that the workers are
+            # alive, starting right away as a worker might fetch a long job
+            # while the others are still being spawned
+            job_q = self.manager_objects[0]
+            try:
+                lease_timeout = job_q.get_lease_timeout()
+            except Exception as e:
+                if self.verbose > 0:
+                    print("{}: could not get lease_timeout from server: {}".format(self._identifier, e))
+                lease_timeout = None
+            heartbeat_stop = threading.Event()
+            if lease_timeout is not None:
+                heartbeat_thread = threading.Thread(target=self._heartbeat_loop, args=(job_q, lease_timeout / 3, heartbeat_stop))
+                heartbeat_thread.daemon = True
+                heartbeat_thread.start()
+            
             for i in range(self.nproc):
                 reset_pbc = lambda: self.pbc.reset(i)
                 p = mp.Process(target=self.__worker_func, args=(self.func, 
@@ -575,7 +762,12 @@ class JobManager_Client(object):
                                                                 c[i],
                                                                 m_set_by_function[i],
                                                                 reset_pbc,
-                                                                self.njobs))
+                                                                self.njobs,
+                                                                self.batch_size,
+                                                                self.result_batch_size,
+                                                                self.result_batch_bytes,
+                                                                self.result_batch_time,
+                                                                self.prefetch))
                 self.procs.append(p)
                 p.start()
                 time.sleep(0.3)
@@ -605,6 +797,8 @@ class JobManager_Client(object):
 
                 if self.verbose > 2:
                     print("{}: process {} PID {} was joined".format(self._identifier, p, p.pid))
+            
+            heartbeat_stop.set()
                     
                     
             if self.verbose > 2:
@@ -620,13 +814,14 @@ class JobManager_Server(object):
         - init the JobManager_Server, start SyncManager server process
         
         - pass the arguments to be processed to the JobManager_Server
-        (put_arg, args_from_list)
+        (put_arg, args_from_list, args_from_iter)
         
         - start the JobManager_Server (start), which means to wait for incoming 
         results and to process them. Afterwards process all obtained data.
         
     The default behavior of handling each incoming new result is to simply
-    add the pair (arg, result) to the final_result list.
+    add the pair (arg, result) to the final_result list. For long runs pass
+    a result_sink (see sinks) to stream the results to disk instead.
     
     When finished the default final processing is to dump the
     final_result list to fname_for_final_result_dump
@@ -665,7 +860,17 @@ class JobManager_Server(object):
                   verbose=1, 
                   msg_interval=1,
                   fname_dump='auto',
-                  speed_calc_cycles=50):
+                  speed_calc_cycles=50,
+                  lease_timeout=None,
+                  fname_journal=None,
+                  result_sink=None,
+                  result_workers=0,
+                  result_worker_type='thread',
+                  result_ordered=True,
+                  result_max_pending=None,
+                  speculative_copies=0,
+                  retry_policy=None,
+                  fname_failure_log='auto'):
         """
         authkey [string] - authentication key used by the SyncManager. 
         Server and Client must have the same authkey.
@@ -691,6 +896,55 @@ class JobManager_Server(object):
         of not successfully processed arguments, if there are any. 
         (None: do not dump, 'auto' choose filename 'YYYY_MM_DD_hh_mm_ss_fail.dump')
         
+        lease_timeout [float/None] - if not None, the arguments handed out to a client's
+        worker are leased to that worker. The client confirms regularly that the
+        worker is still alive. If a worker has not been seen for lease_timeout
+        seconds (e.g. the client got killed or its node died) the arguments leased
+        to it are put back to the job_q automatically (see JobQueue).
+        
+        fname_journal [string/None] - if not None, the state of the server is written
+        to this file incrementally while running. When start() is called, a checkpoint 
+        of the current state is written, followed by one record for each completed or
+        failed job (and for each argument taken from the job source). So, in contrast to 
+        the dump written on shutdown, nothing gets lost if the server crashes. 
+        read_old_state replays the journal, if it exists. The results are not loaded back 
+        to memory on replay, use iter_journal to read them from the journal.
+        
+        result_sink [ResultSink/None] - if not None, the results are passed to the result sink
+        (see sinks) which streams them to disk, instead of collecting them in final_result.
+        The sink is flushed before process_final_result is called and closed on shutdown.
+        
+        result_workers [int] - if > 0, prepare_new_result is run on a pool of result_workers
+        threads or processes, so heavy post-processing of the results does not block
+        receiving new results. Only the cheap process_new_result (and the bookkeeping) 
+        stays on the main loop. 0 (default) means no pool.
+        
+        result_worker_type ['thread'/'process'] - use threads (fine if prepare_new_result 
+        releases the GIL, e.g. numpy/scipy or I/O) or processes for the pool
+        
+        result_ordered [bool] - if True, process_new_result is called in the order the 
+        results were received, otherwise in the order prepare_new_result finished
+        
+        result_max_pending [int/None] - maximum number of results being prepared at a time
+        (default: 2*result_workers). If reached, no more results are received until one 
+        got done, so the results queue up at the clients (back-pressure).
+        
+        speculative_copies [int] - tail mode, if > 0, clients asking for work when the job_q 
+        is empty get duplicates of the oldest arguments still being processed, at most
+        speculative_copies per argument (see JobQueue). So the end of a run is not 
+        dominated by a slow node. The first result for an argument is used, the 
+        duplicates are dropped. 0 (default) disables the tail mode.
+        
+        retry_policy [RetryPolicy/None] - if not None, a failed job is put back to the
+        job_q automatically, as long as the policy permits (see RetryPolicy). Only when
+        no more retries are allowed, the job counts as failed. None (default) means 
+        no retries. Note that the number of attempts is not part of the dump.
+        
+        fname_failure_log [string/None] - the clients send the traceback of each failure to
+        the server, which collects them in the failure_log (see FailureLog). On shutdown the 
+        failure log is written to this file, if there were any failures. ('auto': 
+        '<authkey>_YYYY_MM_DD_hh_mm_ss.failures', None: do not write the failure log)
+        
         This init actually starts the SyncManager as a new process. As a next step
         the job_q has to be filled, see put_arg().
         """
@@ -702,8 +956,6 @@ class JobManager_Server(object):
         if self.verbose > 1:
             print("{}: I'm the JobManager_Server main process".format(self._identifier))
         
-        self.__wait_before_stop = 2
-        
         self.port = port
 
         if isinstance(authkey, bytearray):
@@ -716,6 +968,11 @@ class JobManager_Server(object):
         
         
         self.fname_dump = fname_dump        
+        self.fname_journal = fname_journal
+        self._journal = None            # file object of the journal while running
+        self._journal_end = None        # end of the last valid record after replay 
+        self._journal_dirty = False     # records written but not flushed
+        self._journal_source = True     # False if the job source can not be journaled
         self.msg_interval = msg_interval
         self.speed_calc_cycles = speed_calc_cycles
 
@@ -731,14 +988,64 @@ class JobManager_Server(object):
         self._numresults = mp.Value('i', 0)  # count the successfully processed jobs
         self._numjobs = mp.Value('i', 0)     # overall number of jobs
         
+        # the args where processing failed, as received from the fail_q 
+        # the failed args are still in args_set, so they are processed
+        # again when the state is read from a dump 
+        self.fail_list = []
+        self.fail_set = set()
+        
+        self.retry_policy = retry_policy
+        
+        # the tracebacks of the failures (see FailureLog)
+        self.failure_log = FailureLog()
+        self.fname_failure_log = fname_failure_log
+        self.numretried = 0       # count the retries of failed jobs
+        self._attempts = {}       # arg -> number of failed attempts 
+        
+        # set when start() has processed all jobs, e.g. to let other
+        # processes wait for the server to be done 
+        self.all_done = mp.Event()
+        
+        # iterator providing further arguments (see args_from_iter)
+        self.job_source = None
+        self.job_source_high = None
+        self.job_source_low = None
+        # if not None, put_arg collects the (arg, priority) pairs here, 
+        # to put them to the job_q at once (see _feed_job_q)
+        self._put_buffer = None
+        
         # final result as list, other types can be achieved by subclassing 
         self.final_result = []
+        self.result_sink = result_sink
+        
+        if result_workers < 0:
+            raise ValueError("result_workers must be >= 0 (got {})".format(result_workers))
+        if result_worker_type not in ('thread', 'process'):
+            raise ValueError("result_worker_type must be 'thread' or 'process' (got '{}')".format(result_worker_type))
+        if (result_workers > 0) and (futures is None):
+            raise ImportError("result_workers > 0 requires the module concurrent.futures (futures backport on python 2)")
+        if result_max_pending is None:
+            result_max_pending = 2*result_workers
+        if (result_workers > 0) and (result_max_pending < 1):
+            raise ValueError("result_max_pending must be >= 1 (got {})".format(result_max_pending))
+        self.result_workers = result_workers
+        self.result_worker_type = result_worker_type
+        self.result_ordered = result_ordered
+        self.result_max_pending = result_max_pending
+        self._pending = collections.deque()   # (arg, future) of the results being prepared
+        self._pending_args = set()
+        self._done_args = []                  # args to release from the job_q (leases, in flight)
         
         # NOTE: it only works using multiprocessing.Queue()
         # the Queue class from the module queue does NOT work  
-        self.job_q = myQueue()    # queue holding args to process
+        self.lease_timeout = lease_timeout
+        self.numrequeued = 0      # count the args put back due to expired leases
+        self.speculative_copies = speculative_copies
+        self.numspeculative = 0   # count the duplicates handed out in tail mode
+        # queue holding args to process
+        self.job_q = JobQueue(lease_timeout=lease_timeout, speculative_copies=speculative_copies)
         self.result_q = myQueue() # queue holding returned results
-        self.fail_q = myQueue()   # queue holding args where processing failed
+        self.fail_q = myQueue()   # queue transferring args where processing failed
         self.manager = None
         self.hostname = socket.gethostname()
         
@@ -850,6 +1157,10 @@ class JobManager_Server(object):
     @numresults.setter
     def numresults(self, numresults):
         self._numresults.value = numresults
+        
+    @property
+    def numfailed(self):
+        return len(self.fail_set)
 
     def shutdown(self):
         """"stop all spawned processes and clean up
@@ -859,10 +1170,21 @@ class JobManager_Server(object):
         """
         # will only be False when _shutdown was started in subprocess
         
+        # receive the failures still in the fail_q and write 
+        # what is left to the journal
+        self._drain_fail_q()
+        self._journal_close()
+        
+        if self.result_sink is not None:
+            self.result_sink.flush()
+        
         # do user defined final processing
         self.process_final_result()
         if self.verbose > 1:
             print("{}: process_final_result done!".format(self._identifier))
+            
+        if self.result_sink is not None:
+            self.result_sink.close()
         
         # print(self.fname_dump)
         if self.fname_dump is not None:
@@ -882,6 +1204,16 @@ class JobManager_Server(object):
         else:
             if self.verbose > 0:
                 print("{}: fname_dump == None, ignore dumping current state!".format(self._identifier))
+                
+        if (self.fname_failure_log is not None) and (len(self.failure_log) > 0):
+            if self.fname_failure_log == 'auto':
+                fname = "{}_{}.failures".format(self.authkey.decode('utf8'), getDateForFileName(includePID=False))
+            else:
+                fname = self.fname_failure_log
+            if self.verbose > 0:
+                print("{}: write the tracebacks of the failures to '{}'".format(self._identifier, fname))
+            with open(fname, 'w') as f:
+                self.failure_log.write(f)
         
         # start also makes sure that it was not started as subprocess
         # so at default behavior this assertion will allays be True
@@ -900,7 +1232,7 @@ class JobManager_Server(object):
         if self.verbose > 0:
             all_jobs = self.numjobs
             succeeded = self.numresults
-            failed = self.fail_q.qsize()
+            failed = self.numfailed
             all_processed = succeeded + failed
             
             id  = self._identifier + ": "
@@ -921,6 +1253,17 @@ class JobManager_Server(object):
             print("{}    queried         : {}".format(id2, queried_but_not_processed))
             print("{}    not queried yet : {}".format(id2, not_queried))
             print("{}len(args_set) : {}".format(id2, len(self.args_set)))
+            if self.lease_timeout is not None:
+                print("{}requeued (expired leases) : {}".format(id2, self.numrequeued))
+            if self.speculative_copies > 0:
+                print("{}speculative duplicates    : {}".format(id2, self.numspeculative))
+            if self.retry_policy is not None:
+                print("{}retried (failed jobs)     : {}".format(id2, self.numretried))
+            counts = self.failure_log.counts()
+            if len(counts) > 0:
+                print("{}failures by exception type:".format(id2))
+                for err_name in sorted(counts, key=counts.get, reverse=True):
+                    print("{}  {:<23} : {}".format(id2, err_name, counts[err_name]))
             if (all_not_processed + failed) != len(self.args_set):
                 raise RuntimeWarning("'all_not_processed != len(self.args_set)' something is inconsistent!")
             
@@ -940,36 +1283,132 @@ class JobManager_Server(object):
 #         print(len(data['args_set']))
         
         fail_list = pickle.load(f)
-        data['fail_set'] = {fail_item[0] for fail_item in fail_list}
         
+        # the job source (see args_from_iter) is not part of older dumps
+        try:
+            data['job_source'], data['job_source_high'], data['job_source_low'] = pickle.load(f)
+        except EOFError:
+            data['job_source'], data['job_source_high'], data['job_source_low'] = None, None, None
+        
+        JobManager_Server._fill_queues(data, fail_list)
+        return data
+    
+    @staticmethod
+    def _fill_queues(data, fail_list):
+        data['fail_list'] = fail_list
+        data['fail_set'] = {fail_item[0] for fail_item in fail_list}
         data['fail_q'] = myQueue()
-        data['job_q'] = myQueue()
+        data['job_q'] = JobQueue()
         
         for fail_item in fail_list:
             data['fail_q'].put_nowait(fail_item)
         for arg in (data['args_set'] - data['fail_set']):
             data['job_q'].put_nowait(arg)
 
+    @staticmethod
+    def static_load_journal(f):
+        """read the state from a journal (see fname_journal)
+        
+        The checkpoint at the beginning of the journal is updated by all the 
+        records that follow. An incomplete record at the end (e.g. due to
+        a crash while writing) is ignored. The results are NOT loaded, so 
+        final_result is an empty list (use iter_journal to get the results).
+        
+        In addition to the keys of static_load, the returned dict holds 
+        'journal_end', the position after the last valid record.
+        """
+        data = None
+        fail_list = []
+        journal_end = f.tell()
+        while True:
+            try:
+                record = pickle.load(f)
+            except EOFError:
+                break
+            except Exception as e:
+                print("WARNING: ignore incomplete record at the end of the journal ({})".format(e))
+                break
+            
+            kind = record[0]
+            if kind == 'state':
+                data = record[1]
+                fail_list = list(data.pop('fail_list'))
+            elif data is None:
+                raise RuntimeError("the journal does not start with a checkpoint of the state")
+            elif kind == 'put':
+                data['args_set'].add(record[1])
+                data['numjobs'] += 1
+            elif kind == 'source':
+                data['job_source'], data['job_source_high'], data['job_source_low'] = pickle.loads(record[1])
+            elif kind == 'result':
+                data['args_set'].discard(record[1])
+            elif kind == 'fail':
+                fail_list.append(record[1])
+            journal_end = f.tell()
+            
+        if data is None:
+            raise RuntimeError("the journal holds no checkpoint of the state")
+        
+        data['numresults'] = data['numjobs'] - len(data['args_set'])
+        data['final_result'] = []
+        data['journal_end'] = journal_end
+        # an arg may have failed on one worker and succeeded on an other
+        fail_list = [fail_item for fail_item in fail_list if fail_item[0] in data['args_set']]
+        JobManager_Server._fill_queues(data, fail_list)
         return data
-
-    def __load(self, f):
-        data = JobManager_Server.static_load(f)
+    
+    @staticmethod
+    def iter_journal(fname_journal):
+        """iterate over the (arg, result) pairs written to the journal fname_journal"""
+        with open(fname_journal, 'rb') as f:
+            while True:
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception:
+                    # incomplete last record
+                    break
+                if record[0] == 'result':
+                    yield record[1], record[2]
+            
+    def __load(self, f, journal=False):
+        if journal:
+            data = JobManager_Server.static_load_journal(f)
+            self._journal_end = data['journal_end']
+        else:
+            data = JobManager_Server.static_load(f)
         for key in ['numjobs', 'numresults', 'final_result',
-                    'args_set', 'fail_q','job_q']:
+                    'args_set', 'fail_list', 'fail_set', 'job_q', 'job_source', 
+                    'job_source_high', 'job_source_low']:
             self.__setattr__(key, data[key])
+        self.job_q._init_leases(self.lease_timeout)
+        self.job_q.speculative_copies = self.speculative_copies
+        
+    def _job_source_state(self):
+        """the job source (see args_from_iter) as pickled tuple (iterator, high, low)
+        
+        returns None if the job source can not be pickled
+        """
+        try:
+            return pickle.dumps((self.job_source, self.job_source_high, self.job_source_low), 
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print("{}: WARNING the job source is not exhausted and can not be dumped ({}), the remaining arguments are lost".format(self._identifier, e))
+            return None
         
     def __dump(self, f):
         pickle.dump(self.numjobs, f, protocol=pickle.HIGHEST_PROTOCOL)
         pickle.dump(self.numresults, f, protocol=pickle.HIGHEST_PROTOCOL)
         pickle.dump(self.final_result, f, protocol=pickle.HIGHEST_PROTOCOL)
         pickle.dump(self.args_set, f, protocol=pickle.HIGHEST_PROTOCOL)
-        fail_list = []
-        try:
-            while True:
-                fail_list.append(self.fail_q.get_nowait())
-        except queue.Empty:
-            pass
-        pickle.dump(fail_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._drain_fail_q()
+        pickle.dump(self.fail_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        job_source_dump = self._job_source_state()
+        if job_source_dump is None:
+            job_source_dump = pickle.dumps((None, None, None), protocol=pickle.HIGHEST_PROTOCOL)
+        f.write(job_source_dump)
         
 #         print('numjobs', self.numjobs)
 #         print('numresults', self.numresults)
@@ -978,6 +1417,19 @@ class JobManager_Server(object):
 #         print('fail_list', fail_list)
         
     def read_old_state(self, fname_dump=None):
+        """load the state from the dump file fname_dump (default: self.fname_dump)
+        
+        If fname_journal was set and the journal exists, the state is replayed
+        from the journal instead (see static_load_journal). The new records
+        will then be appended to that journal.
+        """
+        if (self.fname_journal is not None) and os.path.isfile(self.fname_journal):
+            if self.verbose > 0:
+                print("{}: replay state from journal '{}'".format(self._identifier, self.fname_journal))
+            with open(self.fname_journal, 'rb') as f:
+                self.__load(f, journal=True)
+            self.show_statistics()
+            return
         
         if fname_dump == None:
             fname_dump = self.fname_dump
@@ -994,9 +1446,65 @@ class JobManager_Server(object):
             self.__load(f)
         
         self.show_statistics()
+        
+    def _journal_open(self):
+        """open the journal, write a checkpoint of the current state if it is a new one"""
+        if self._journal_end is not None:
+            # state has been replayed from that journal, continue it
+            self._journal = open(self.fname_journal, 'r+b')
+            self._journal.seek(self._journal_end)
+            self._journal.truncate()
+            return
+        
+        if self.verbose > 1:
+            print("{}: write checkpoint to journal '{}'".format(self._identifier, self.fname_journal))
+        self._journal = open(self.fname_journal, 'wb')
+        state = {'numjobs'  : self.numjobs,
+                 'args_set' : self.args_set,
+                 'fail_list': self.fail_list}
+        pickle.dump(('state', state), self._journal, protocol=pickle.HIGHEST_PROTOCOL)
+        self._journal_write_source()
+        self._journal.flush()
+        
+    def _journal_write(self, record):
+        if self._journal is not None:
+            self._journal.write(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+            self._journal_dirty = True
+            
+    def _journal_flush(self):
+        """flush the records written since the last flush"""
+        if self._journal_dirty:
+            self._journal.flush()
+            self._journal_dirty = False
+        
+    def _journal_write_source(self):
+        if (self._journal is None) or (not self._journal_source):
+            return
+        job_source_dump = self._job_source_state()
+        if job_source_dump is None:
+            # can not be resumed anyway, so do not try again 
+            self._journal_source = False
+            job_source_dump = pickle.dumps((None, None, None), protocol=pickle.HIGHEST_PROTOCOL)
+        self._journal_write(('source', job_source_dump))
+        
+    def _journal_close(self):
+        if self._journal is None:
+            return
+        self._journal.close()
+        self._journal = None
+        self._journal_dirty = False
+        # the journal file now reflects the current state
+        self._journal_end = os.path.getsize(self.fname_journal)
             
-    def put_arg(self, a):
+    def put_arg(self, a, priority=0):
         """add argument a to the job_q
+        
+        Arguments with a higher priority are handed out to the clients first.
+        E.g. use the expected run time as priority to start the long jobs early,
+        so the end of the run is not dominated by a long job started last.
+        Arguments with equal priority are handed out in the order they were put.
+        Note that the priority is not part of the dump, all arguments read from
+        a dump have priority 0.
         """
         if (not hasattr(a, '__hash__')) or (a.__hash__ == None):
             # try to add hashability
@@ -1008,25 +1516,195 @@ class JobManager_Server(object):
                 raise AttributeError("'{}' is not hashable".format(type(a)))
         
         self.args_set.add(copy.copy(a))
-        self.job_q.put(copy.copy(a))
+        if self._put_buffer is not None:
+            self._put_buffer.append((copy.copy(a), priority))
+        else:
+            self.job_q.put(copy.copy(a), priority=priority)
+        self._journal_write(('put', a))
         
         with self._numjobs.get_lock():
             self._numjobs.value += 1
         
-    def args_from_list(self, args):
+    def args_from_list(self, args, priority=0):
         """serialize a list of arguments to the job_q
+        
+        priority [number/callable] - the priority of all the arguments, or a 
+        function returning the priority of an argument (see put_arg)
         """
         for a in args:
-            self.put_arg(a)
+            if callable(priority):
+                self.put_arg(a, priority=priority(a))
+            else:
+                self.put_arg(a, priority=priority)
+            
+    def args_from_iter(self, args, high_watermark=10000, low_watermark=None):
+        """use the iterable args (e.g. a generator) as source of arguments
+        
+        In contrast to args_from_list, the arguments are not all put to the
+        job_q at once. Initially up to high_watermark arguments are put to the
+        job_q. While running (see start), whenever the job_q holds less than
+        low_watermark (default: high_watermark/2) arguments, it is refilled up
+        to high_watermark arguments. So the memory needed by the server stays
+        bounded, no matter how many arguments the source provides.
+        
+        For a ParameterSweep the pending arguments are tracked by their 
+        index in a bitmap (see IndexSet).
+        
+        Note that numjobs counts the arguments taken from the source so far.
+        If the source is not exhausted on shutdown, it is dumped as well, 
+        provided it can be pickled (e.g. the iterator of a ParameterSweep).
+        Otherwise (e.g. a generator) the remaining arguments are lost.
+        """
+        if self.job_source is not None:
+            raise RuntimeError("a job source has already been set")
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+        if not (0 <= low_watermark < high_watermark):
+            raise ValueError("0 <= low_watermark < high_watermark required (got {}, {})".format(low_watermark, high_watermark))
+        
+        if isinstance(args, ParameterSweep):
+            if len(self.args_set) > 0:
+                raise RuntimeError("a ParameterSweep can not be combined with other arguments")
+            self.args_set = IndexSet(args)
+        
+        self.job_source = iter(args)
+        self.job_source_high = high_watermark
+        self.job_source_low = low_watermark
+        self._feed_job_q(force=True)
+        
+    def _feed_job_q(self, force=False):
+        """refill the job_q from the job source (see args_from_iter)"""
+        if self.job_source is None:
+            return
+        qsize = self.job_q.qsize()
+        if (not force) and (qsize >= self.job_source_low):
+            return
+        
+        # a single round trip to the job_q for all new args
+        self._put_buffer = []
+        try:
+            for i in range(self.job_source_high - qsize):
+                try:
+                    a = next(self.job_source)
+                except StopIteration:
+                    self.job_source = None
+                    if self.verbose > 1:
+                        print("{}: job source exhausted".format(self._identifier))
+                    break
+                self.put_arg(a)
+        finally:
+            items, self._put_buffer = self._put_buffer, None
+            if len(items) > 0:
+                self.job_q.put_many(items)
+        self._journal_write_source()
 
     def process_new_result(self, arg, result):
         """Will be called when the result_q has data available.      
-        result is the computed result to the argument arg.
+        result is the computed result to the argument arg (as returned by 
+        prepare_new_result). It is always called from the main loop of start().
         
         Should be overwritten by subclassing!
+        
+        By default the pair (arg, result) is passed to the result_sink
+        if one was given, otherwise it is appended to final_result.
+        """
+        if self.result_sink is not None:
+            self.result_sink.put(arg, result)
+        else:
+            self.final_result.append((arg, result))
+    
+    @staticmethod
+    def prepare_new_result(arg, result):
+        """Will be called for each new result before process_new_result, which
+        receives the return value instead of result.
+        
+        Put heavy post-processing (fitting, FFTs, ...) of a result here, and
+        set result_workers to run it on a pool of threads or processes. 
+        Therefore it must be a staticmethod without side effects on the server.
+        By default result is returned unchanged.
         """
-        self.final_result.append((arg, result))
+        return result
     
+    def _new_result(self, arg, result):
+        """do the bookkeeping for the new (prepared) result and process it"""
+        self.args_set.remove(arg)
+        self._attempts.pop(arg, None)
+        if arg in self.fail_set:
+            # it failed on an other worker before
+            self.fail_set.remove(arg)
+            self.fail_list = [fail_item for fail_item in self.fail_list if fail_item[0] != arg]
+        self.numresults = self.numjobs - len(self.args_set)
+        self._journal_write(('result', arg, result))
+        self.process_new_result(arg, result)
+        if (self.lease_timeout is not None) or (self.speculative_copies > 0):
+            self._done_args.append(arg)
+    
+    def _drain_fail_q(self):
+        """receive the failed args from the fail_q and do the bookkeeping"""
+        while True:
+            try:
+                fail_item = self.fail_q.get_nowait()
+            except queue.Empty:
+                return
+            if len(fail_item) > 4:
+                # (arg, err_name, hostname, signature, traceback), the traceback is
+                # sent only once per signature and worker, keep it in the failure_log
+                self.failure_log.add(*fail_item)
+                fail_item = fail_item[:4]
+            arg = fail_item[0]
+            if (arg not in self.args_set) or (arg in self.fail_set) or (arg in self._pending_args):
+                # the arg has been processed by an other worker 
+                # (see lease_timeout) 
+                if self.verbose > 1:
+                    print("{}: ignore failure for arg {} which is done already".format(self._identifier, arg))
+                continue
+            
+            if self.retry_policy is not None:
+                err_name, hostname = fail_item[1], fail_item[2]
+                attempt = self._attempts.get(arg, 0) + 1
+                self._attempts[arg] = attempt
+                delay = self.retry_policy.retry_delay(arg, err_name, hostname, attempt)
+                if delay is not None:
+                    if self.verbose > 1:
+                        print("{}: arg {} failed with {} on {}, retry in {}s".format(self._identifier, arg, err_name, hostname, delay))
+                    avoid_hosts = [hostname] if self.retry_policy.other_host else None
+                    self.job_q.put(arg, avoid_hosts=avoid_hosts, delay=delay)
+                    self.numretried += 1
+                    continue
+                
+            self.fail_list.append(fail_item)
+            self.fail_set.add(arg)
+            self._attempts.pop(arg, None)
+            self._journal_write(('fail', fail_item))
+            if self.verbose > 1:
+                print("{}: arg {} failed with {} on {}".format(self._identifier, arg, fail_item[1], fail_item[2]))
+                
+    def _collect_prepared(self, block=False):
+        """process the results prepared by the pool (see result_workers)
+        
+        block [bool] - wait until at least one result is done
+        """
+        if len(self._pending) == 0:
+            return
+        if self.result_ordered:
+            if block:
+                futures.wait([self._pending[0][1]])
+            while (len(self._pending) > 0) and self._pending[0][1].done():
+                arg, future = self._pending.popleft()
+                self._pending_args.remove(arg)
+                self._new_result(arg, future.result())
+        else:
+            if block:
+                futures.wait([f for a, f in self._pending], return_when=futures.FIRST_COMPLETED)
+            still_pending = collections.deque()
+            for arg, future in self._pending:
+                if future.done():
+                    self._pending_args.remove(arg)
+                    self._new_result(arg, future.result())
+                else:
+                    still_pending.append((arg, future))
+            self._pending = still_pending
+
     def process_final_result(self):
         """to implement user defined final processing"""
         pass
@@ -1052,7 +1730,7 @@ class JobManager_Server(object):
                 
             raise RuntimeError("inconsistency detected! (self.numjobs - self.numresults) != len(self.args_set)! use JobManager_Server.put_arg to put arguments to the job_q")
         
-        if self.numjobs == 0:
+        if (self.numjobs == 0) and (self.job_source is None):
             print("{}: WARNING no jobs to process! use JobManager_Server.put_arg to put arguments to the job_q".format(self._identifier))
             return
         else:
@@ -1061,6 +1739,13 @@ class JobManager_Server(object):
         Signal_to_sys_exit(signals=[signal.SIGTERM, signal.SIGINT], verbose = self.verbose)
         pid = os.getpid()
         
+        # the job_q (including the lease bookkeeping) lives in the SyncManager 
+        # process from now on, so it needs to be accessed via a proxy 
+        self.job_q = self.manager.get_job_q()
+        
+        if self.fname_journal is not None:
+            self._journal_open()
+        
         if self.verbose > 1:
             print("{}: start processing incoming results".format(self._identifier))
         
@@ -1078,19 +1763,88 @@ class JobManager_Server(object):
                       sigterm='ign') as stat:
 
             stat.start()
-        
-            while (len(self.args_set) - self.fail_q.qsize()) > 0:
-                try:
-                    arg, result = self.result_q.get(timeout=1)
-                    self.args_set.remove(arg)
-                    self.numresults = self.numjobs - len(self.args_set)
-                    self.process_new_result(arg, result)
-                except queue.Empty:
-                    pass
-        
-        if self.verbose > 1:
-            print("{}: wait {}s before trigger clean up".format(self._identifier, self.__wait_before_stop))
-        time.sleep(self.__wait_before_stop)
+            
+            t_lease = time.time()
+            
+            if self.result_workers > 0:
+                if self.result_worker_type == 'thread':
+                    pool = futures.ThreadPoolExecutor(max_workers=self.result_workers)
+                else:
+                    pool = futures.ProcessPoolExecutor(max_workers=self.result_workers)
+            else:
+                pool = None
+            
+            try:
+                while (self.job_source is not None) or (len(self.args_set) - self.numfailed > 0):
+                    self._feed_job_q()
+                    
+                    # in tail mode release at once, to avoid needless duplicates
+                    if (len(self._done_args) > 0) and ((self.speculative_copies > 0) or (time.time() - t_lease > 1)):
+                        self.job_q.release(self._done_args)
+                        self._done_args = []
+                    
+                    if (self.lease_timeout is not None) and (time.time() - t_lease > 1):
+                        requeued = self.job_q.requeue_expired()
+                        if len(requeued) > 0:
+                            self.numrequeued += len(requeued)
+                            if self.verbose > 0:
+                                print("{}: leases expired, put {} arg(s) back to the job_q".format(self._identifier, len(requeued)))
+                        t_lease = time.time()
+                    
+                    if pool is not None:
+                        self._collect_prepared()
+                    
+                    # wake up as soon as a result or a failure arrives,
+                    # do not wait long while some results are being prepared
+                    timeout = 0.01 if len(self._pending) > 0 else 1
+                    # everything written to the journal since the last wait 
+                    # (results, failures, refills) is on disk before waiting again
+                    self._journal_flush()
+                    ready = wait_for_queues([self.result_q, self.fail_q], timeout=timeout)
+                    if self.fail_q in ready:
+                        self._drain_fail_q()
+                    if self.result_q not in ready:
+                        continue
+                    try:
+                        item = self.result_q.get_nowait()
+                    except queue.Empty:
+                        continue
+                    
+                    # a client may send a list of (arg, result) pairs (see ResultBuffer)
+                    if isinstance(item, list):
+                        results = item
+                    else:
+                        results = [item]
+                    for arg, result in results:
+                        if (arg not in self.args_set) or (arg in self._pending_args):
+                            # may happen when an argument has been put back due to an 
+                            # expired lease, although its original worker was still alive
+                            if self.verbose > 1:
+                                print("{}: ignore result for arg {} which is done already".format(self._identifier, arg))
+                            continue
+                        if pool is None:
+                            self._new_result(arg, self.prepare_new_result(arg, result))
+                        else:
+                            # back-pressure, wait until there is room for another result
+                            while len(self._pending) >= self.result_max_pending:
+                                self._collect_prepared(block=True)
+                            self._pending.append((arg, pool.submit(self.prepare_new_result, arg, result)))
+                            self._pending_args.add(arg)
+                
+                self.all_done.set()
+            finally:
+                if pool is not None:
+                    # drop the results still being prepared, 
+                    # their args are still in args_set
+                    for arg, future in self._pending:
+                        future.cancel()
+                    self._pending.clear()
+                    self._pending_args.clear()
+                    pool.shutdown(wait=False)
+                if self.speculative_copies > 0:
+                    self.numspeculative = self.job_q.get_numspeculative()
+            
+            self._journal_close()
         
 
 class JobManager_Local(JobManager_Server):
@@ -1108,7 +1862,8 @@ class JobManager_Local(JobManager_Server):
                   niceness_clients=19,
                   msg_interval=1,
                   fname_dump='auto',
-                  speed_calc_cycles=50):
+                  speed_calc_cycles=50,
+                  batch_size=1):
         
         super(JobManager_Local, self).__init__(authkey=authkey,
                          const_arg=const_arg, 
@@ -1126,6 +1881,7 @@ class JobManager_Local(JobManager_Server):
         self.show_statusbar_for_jobs = show_statusbar_for_jobs
         self.show_counter_only = show_counter_only
         self.niceness_clients = niceness_clients
+        self.batch_size = batch_size
 
     @staticmethod 
     def _start_client(authkey,
@@ -1136,7 +1892,8 @@ class JobManager_Local(JobManager_Server):
                         delay=1, 
                         verbose=0, 
                         show_statusbar_for_jobs=False,
-                        show_counter_only=False):        # ignore signal, because any signal bringing the server down
+                        show_counter_only=False,
+                        batch_size=1):        # ignore signal, because any signal bringing the server down
         # will cause an error in the client server communication
         # therefore the clients will also quit 
         Signal_to_SIG_IGN(verbose=verbose)
@@ -1148,7 +1905,8 @@ class JobManager_Local(JobManager_Server):
                               nice=nice,
                               verbose=verbose,
                               show_statusbar_for_jobs=show_statusbar_for_jobs,
-                              show_counter_only=show_counter_only)
+                              show_counter_only=show_counter_only,
+                              batch_size=batch_size)
         
         client.start()
         
@@ -1163,7 +1921,8 @@ class JobManager_Local(JobManager_Server):
                                     self.delay,
                                     self.verbose_client,
                                     self.show_statusbar_for_jobs,
-                                    self.show_counter_only))
+                                    self.show_counter_only,
+                                    self.batch_size))
         p_client.start()
         super(JobManager_Local, self).start()
         
@@ -1267,10 +2026,918 @@ class Signal_to_terminate_process_list(object):
                                                auto_kill_on_last_resort=False)
 
 
+class RetryPolicy(object):
+    """
+    decides whether a failed job is put back to the job_q (see JobManager_Server)
+    
+    A job is retried until it failed max_attempts times in total. The limit can
+    be set per exception type by max_attempts_per_error, which maps the name of
+    the exception (or the exception class) to the maximum number of attempts,
+    e.g. {'MemoryError': 5, 'ValueError': 1} to retry out-of-memory errors more
+    often, but never retry a ValueError.
+    
+    The n-th retry is delayed by backoff * backoff_factor**(n-1) seconds. If 
+    other_host is True, the job is preferably retried on a different host than
+    the one where it failed. Meanwhile the job waits in the job_q (see
+    JobQueue), so the clients do not quit before it has been retried.
+    
+    Subclass and overwrite retry_delay for other rules.
+    """
+    def __init__(self, max_attempts=3, max_attempts_per_error=None, backoff=0, 
+                 backoff_factor=2, other_host=False):
+        """
+        max_attempts [int] - maximum number of attempts to process a job (1: no retry)
+        
+        max_attempts_per_error [dict/None] - exception name or class -> max_attempts
+        
+        backoff [float] - delay of the first retry in seconds
+        
+        backoff_factor [float] - the delay grows by this factor for each retry
+        
+        other_host [bool] - try to retry on a different host
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1 (got {})".format(max_attempts))
+        self.max_attempts = max_attempts
+        self.max_attempts_per_error = {}
+        if max_attempts_per_error is not None:
+            for err, n in max_attempts_per_error.items():
+                if isinstance(err, type):
+                    err = err.__name__
+                self.max_attempts_per_error[err] = n
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.other_host = other_host
+        
+    def retry_delay(self, arg, err_name, hostname, attempt):
+        """
+        return the delay in seconds after which arg is put back to the job_q,
+        or None if arg should not be retried
+        
+        attempt [int] - the number of failed attempts so far (including this one)
+        """
+        if attempt >= self.max_attempts_per_error.get(err_name, self.max_attempts):
+            return None
+        return self.backoff * self.backoff_factor**(attempt - 1)
+
+
+class FailureLog(object):
+    """
+    the tracebacks of the failed jobs, as collected by the JobManager_Server
+    
+    Failures with the same exception type raised at the same place (i.e.
+    the same stack of (file, function, line), see traceback_with_signature)
+    share a signature and are stored only once, together with the number 
+    of occurrences and the argument of the first occurrence. So a systematic
+    bug fills a single entry instead of one file per failure.
+    
+    write creates a single text file, an index of all signatures followed 
+    by the tracebacks.
+    """
+    def __init__(self):
+        # signature -> [err_name, count, traceback, first arg]
+        self.entries = collections.OrderedDict()
+        
+    def __len__(self):
+        return len(self.entries)
+    
+    def add(self, arg, err_name, hostname, signature, trb=None):
+        """count a failure, trb may be None if the traceback was sent before"""
+        e = self.entries.get(signature)
+        if e is None:
+            e = self.entries[signature] = [err_name, 0, None, arg]
+        e[1] += 1
+        if (e[2] is None) and (trb is not None):
+            e[2] = trb
+            
+    def counts(self):
+        """return the dict exception name -> number of failures"""
+        counts = {}
+        for err_name, count, trb, arg in self.entries.values():
+            counts[err_name] = counts.get(err_name, 0) + count
+        return counts
+    
+    def traceback(self, signature):
+        """the traceback of signature (None if it was never received)"""
+        return self.entries[signature][2]
+    
+    def write(self, f):
+        """write the index and the tracebacks to the text file object f"""
+        f.write("# signature   exception   count   first argument\n")
+        for signature, (err_name, count, trb, arg) in self.entries.items():
+            f.write("{}   {}   {}   {!r}\n".format(signature, err_name, count, arg))
+        for signature, (err_name, count, trb, arg) in self.entries.items():
+            f.write("\n## {} {} ({} times)\n".format(signature, err_name, count))
+            f.write(trb if trb is not None else "traceback not available\n")
+
+
+class JobQueue(object):
+    """
+    priority queue holding the arguments to be processed
+
+    The JobManager_Server registers an instance of this class with its
+    SyncManager (see get_job_q). The queue lives in the SyncManager process,
+    everybody else (including the server once it has started) accesses it 
+    via a proxy.
+    
+    Items put with a higher priority are returned first, items of equal
+    priority in the order they were put (FIFO). Apart from the usual queue 
+    operations it provides get_many which allows a client to fetch a whole 
+    batch of arguments with a single round trip through the proxy.
+    
+    If lease_timeout is not None, every argument handed out by get_many 
+    to a certain owner (the client passes (hostname, PID) of the worker) is
+    leased to that owner. The owner has to confirm being alive by calling 
+    heartbeat. Once an owner has not been seen for more than lease_timeout
+    seconds, requeue_expired puts all arguments leased to that owner back
+    to the queue, with their original priority. 
+    
+    If speculative_copies > 0, the arguments handed out by get_many are 
+    tracked as being in flight until they are released. When the queue is 
+    empty, get_many hands out duplicates of the oldest arguments in flight 
+    instead of blocking, at most speculative_copies duplicates per argument
+    and never to an owner already working on it. So idle clients rerun the
+    jobs held by slow nodes at the end of a run, whichever result arrives 
+    first is used by the server.
+    
+    An item put with a delay (e.g. a failed job to be retried, see 
+    RetryPolicy) is held back for delay seconds. An item put with 
+    avoid_hosts is not handed out to an owner on one of those hosts, as 
+    long as some other host asked for work within the last HOST_ACTIVE_TIME
+    seconds. Such deferred items count as pending work, i.e. a blocking 
+    get_many waits for them instead of raising queue.Empty when its timeout
+    runs out. So the workers stay alive until the retries are done.
+    """
+    HOST_ACTIVE_TIME = 10
+    # a blocking get_many waiting for deferred items checks at least that often
+    DEFERRED_CHECK_TIME = 1
+    
+    def __init__(self, maxsize=0, lease_timeout=None, speculative_copies=0):
+        self.maxsize = maxsize
+        # entries are [-priority, count, item, priority]
+        self._heap = []
+        self._count = 0
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._init_leases(lease_timeout)
+        
+        # entries [time due, count, heap entry, hosts to avoid] of the delayed items
+        self._delayed = []
+        # arg -> set of hosts to avoid
+        self._avoid = {}
+        # host -> time it last asked for work
+        self._hosts_seen = {}
+        
+        self.speculative_copies = speculative_copies
+        # arg -> [priority, owners, number of duplicates], oldest first
+        self._inflight = collections.OrderedDict()
+        self.numspeculative = 0
+            
+    def _init_leases(self, lease_timeout):
+        self.lease_timeout = lease_timeout
+        self._lease_lock = threading.Lock()
+        # arg -> (owner, priority)
+        self._leases = {}
+        # owner -> [time last seen, set of leased args] 
+        self._owners = {}
+        
+    def qsize(self):
+        return len(self._heap) + len(self._delayed)
+    
+    def empty(self):
+        return self.qsize() == 0
+    
+    def full(self):
+        return 0 < self.maxsize <= len(self._heap)
+    
+    def _put(self, item, priority):
+        heapq.heappush(self._heap, [-priority, self._count, item, priority])
+        self._count += 1
+
+    def _get(self):
+        return heapq.heappop(self._heap)
+    
+    def put(self, item, block=True, timeout=None, priority=0, avoid_hosts=None, delay=0):
+        """put item to the queue, as for queue.Queue.put, with the given priority
+        
+        avoid_hosts [list/None] - do not hand out item to these hosts (see above)
+        
+        delay [float] - hand out item not before delay seconds have passed
+        """
+        if delay > 0:
+            with self._mutex:
+                entry = [-priority, self._count, item, priority]
+                self._count += 1
+                heapq.heappush(self._delayed, [time.time() + delay, entry[1], entry, avoid_hosts])
+                # a waiting get_many has to adjust its wake up time
+                self._not_empty.notify_all()
+            return
+        
+        with self._not_full:
+            if self.maxsize > 0:
+                if not block:
+                    if len(self._heap) >= self.maxsize:
+                        raise queue.Full
+                else:
+                    t_end = None if timeout is None else time.time() + timeout
+                    while len(self._heap) >= self.maxsize:
+                        remaining = None if t_end is None else t_end - time.time()
+                        if (remaining is not None) and (remaining <= 0):
+                            raise queue.Full
+                        self._not_full.wait(remaining)
+            self._put(item, priority)
+            if avoid_hosts:
+                self._avoid[item] = set(avoid_hosts)
+            self._not_empty.notify()
+            
+    def put_nowait(self, item, priority=0):
+        return self.put(item, block=False, priority=priority)
+    
+    def put_many(self, items):
+        """
+        put all (item, priority) pairs of the list items to the queue at once,
+        regardless of maxsize
+        """
+        with self._mutex:
+            for item, priority in items:
+                self._put(item, priority)
+            self._not_empty.notify_all()
+    
+    def get(self, block=True, timeout=None):
+        """remove and return the item with the highest priority, as for queue.Queue.get"""
+        return self._get_many(1, block, timeout)[0][2]
+    
+    def get_nowait(self):
+        return self.get(block=False)
+    
+    def _get_many(self, n, block, timeout, owner=None):
+        host = None if owner is None else owner[0]
+        t_end = None if timeout is None else time.time() + timeout
+        with self._not_empty:
+            if host is not None:
+                self._hosts_seen[host] = time.time()
+            while True:
+                self._put_due()
+                entries = self._take(n, host)
+                if len(entries) > 0:
+                    break
+                if self.speculative_copies > 0:
+                    entries = self._speculate(n, owner)
+                    if len(entries) > 0:
+                        return entries
+                if not block:
+                    raise queue.Empty
+                
+                deferred = self._deferred_wait()
+                if deferred is not None:
+                    # only deferred items left, they are pending work
+                    self._not_empty.wait(deferred)
+                    continue
+                remaining = None if t_end is None else t_end - time.time()
+                if (remaining is not None) and (remaining <= 0):
+                    raise queue.Empty
+                self._not_empty.wait(remaining)
+            self._not_full.notify(len(entries))
+            
+            if self.speculative_copies > 0:
+                for e in entries:
+                    self._inflight[e[2]] = [e[3], {owner}, 0]
+        return entries
+    
+    def _put_due(self):
+        """move the delayed items which are due to the heap"""
+        t = time.time()
+        while (len(self._delayed) > 0) and (self._delayed[0][0] <= t):
+            t_due, c, entry, avoid_hosts = heapq.heappop(self._delayed)
+            heapq.heappush(self._heap, entry)
+            if avoid_hosts:
+                self._avoid[entry[2]] = set(avoid_hosts)
+                
+    def _deferred_wait(self):
+        """
+        return the time to wait until deferred items need to be checked again,
+        None if there are no deferred items
+        
+        (called only if nothing could be taken from the heap, so all items 
+        still in the heap are avoided on the calling host)
+        """
+        if len(self._heap) > 0:
+            wait = self.DEFERRED_CHECK_TIME
+        elif len(self._delayed) > 0:
+            wait = float('inf')
+        else:
+            return None
+        if len(self._delayed) > 0:
+            wait = min(wait, self._delayed[0][0] - time.time())
+        return max(wait, 0)
+            
+    def _take(self, n, host):
+        """pop at most n entries from the heap, skip the ones to avoid on host"""
+        if len(self._avoid) == 0:
+            return [self._get() for i in range(min(n, len(self._heap)))]
+        
+        entries = []
+        skipped = []
+        while (len(self._heap) > 0) and (len(entries) < n):
+            e = self._get()
+            if self._avoided(e[2], host):
+                skipped.append(e)
+            else:
+                self._avoid.pop(e[2], None)
+                entries.append(e)
+        for e in skipped:
+            heapq.heappush(self._heap, e)
+        return entries
+    
+    def _avoided(self, item, host):
+        hosts = self._avoid.get(item)
+        if (not hosts) or (host not in hosts):
+            return False
+        # only if some other host is around to process item
+        t = time.time()
+        for h, t_seen in self._hosts_seen.items():
+            if (h not in hosts) and (t - t_seen < self.HOST_ACTIVE_TIME):
+                return True
+        return False
+    
+    def _speculate(self, n, owner):
+        """return entries for duplicates of at most n of the oldest args in flight"""
+        entries = []
+        for item, f in self._inflight.items():
+            priority, owners, copies = f
+            if (copies < self.speculative_copies) and (owner not in owners):
+                f[1].add(owner)
+                f[2] += 1
+                entries.append([-priority, None, item, priority])
+                if len(entries) == n:
+                    break
+        self.numspeculative += len(entries)
+        return entries
+    
+    def get_numspeculative(self):
+        """number of duplicates handed out (see speculative_copies)"""
+        return self.numspeculative
+
+    def get_many(self, n, block=True, timeout=None, owner=None):
+        """
+        return a list of at most n items
+
+        The first item is retrieved as for get(block, timeout), so queue.Empty
+        is raised if no item is available at all. Further items are only added
+        as long as they are available immediately.
+        
+        If owner is not None, the items are leased to owner (see above).
+        """
+        entries = self._get_many(n, block, timeout, owner)
+        items = [e[2] for e in entries]
+        
+        if (self.lease_timeout is not None) and (owner is not None):
+            with self._lease_lock:
+                if owner not in self._owners:
+                    self._owners[owner] = [time.time(), set()]
+                o = self._owners[owner]
+                o[0] = time.time()
+                for e in entries:
+                    item = e[2]
+                    self._release(item)
+                    self._leases[item] = (owner, e[3])
+                    o[1].add(item)
+        return items
+    
+    def get_lease_timeout(self):
+        return self.lease_timeout
+    
+    def _release(self, item):
+        """remove the lease of item, return its priority (0 if not leased)"""
+        lease = self._leases.pop(item, None)
+        if lease is None:
+            return 0
+        owner, priority = lease
+        self._owners[owner][1].discard(item)
+        return priority
+    
+    def release(self, items):
+        """
+        the items are done, remove their leases (and stop tracking them as 
+        in flight), delayed copies of them are dropped
+        """
+        if (self.speculative_copies > 0) or (len(self._delayed) > 0):
+            with self._mutex:
+                for item in items:
+                    self._inflight.pop(item, None)
+                if len(self._delayed) > 0:
+                    done = set(items)
+                    self._delayed = [d for d in self._delayed if d[2][2] not in done]
+                    heapq.heapify(self._delayed)
+        if self.lease_timeout is None:
+            return
+        with self._lease_lock:
+            for item in items:
+                self._release(item)
+    
+    def release_owner(self, owner):
+        """remove all leases of owner, e.g. when it terminates regularly"""
+        if self.lease_timeout is None:
+            return
+        with self._lease_lock:
+            o = self._owners.pop(owner, None)
+            if o is not None:
+                for item in o[1]:
+                    del self._leases[item]
+                
+    def heartbeat(self, owners):
+        """confirm that the given owners are still alive"""
+        if self.lease_timeout is None:
+            return
+        t = time.time()
+        with self._lease_lock:
+            for owner in owners:
+                if owner in self._owners:
+                    self._owners[owner][0] = t
+    
+    def put_back(self, items):
+        """put unprocessed items back to the queue and remove their leases"""
+        with self._lease_lock:
+            priorities = [self._release(item) for item in items]
+        if self.speculative_copies > 0:
+            with self._mutex:
+                for item in items:
+                    self._inflight.pop(item, None)
+        for item, priority in zip(items, priorities):
+            self.put(item, priority=priority)
+    
+    def requeue_expired(self):
+        """
+        put all items leased to owners which have not been seen for more than
+        lease_timeout seconds back to the queue
+        
+        returns the list of items put back
+        """
+        if self.lease_timeout is None:
+            return []
+        t = time.time()
+        expired = []
+        with self._lease_lock:
+            for owner in list(self._owners.keys()):
+                t_seen, items = self._owners[owner]
+                if t - t_seen > self.lease_timeout:
+                    for item in list(items):
+                        expired.append((item, self._release(item)))
+                    del self._owners[owner]
+        for item, priority in expired:
+            self.put(item, priority=priority)
+        return [item for item, priority in expired]
+
+
+class ResultBuffer(object):
+    """
+    collects (arg, result) pairs on the client side and passes them
+    as a single list to put (i.e. the put operation of the result_q)
+    
+    The collected results are sent as soon as
+        - max_count results have been collected
+        - their estimated size (see estimate_size) exceeds max_bytes
+        - the oldest result has been waiting for max_time seconds
+    
+    The last two conditions are only checked if max_bytes or max_time
+    is not None. With the default max_count=1 each result is sent
+    immediately as (arg, result) tuple, as without any buffer.
+    
+    If threaded is True, sending is done by a background thread, so put
+    returns immediately. Call close to wait until everything has been sent.
+    An exception raised while sending is reraised by the next call to
+    put, flush or close. 
+    
+    Without the background thread max_time is checked only when put is 
+    called, i.e. a result may wait until the next one arrives. The background
+    thread also sends the results once max_time has passed.
+    """
+    # number of batches waiting to be sent by the background thread
+    MAX_PENDING = 16
+    
+    def __init__(self, put, max_count=1, max_bytes=None, max_time=None, threaded=False):
+        self.put_func = put
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_time = max_time
+        
+        self.items = []
+        self.nbytes = 0
+        self.t0 = None
+        # protects items if the background thread flushes them on time
+        self.lock = threading.Lock()
+        
+        self.thread = None
+        self.error = None
+        if threaded:
+            self.send_q = queue.Queue(maxsize=ResultBuffer.MAX_PENDING)
+            self.thread = threading.Thread(target=self._send_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        
+    def __len__(self):
+        return len(self.items)
+    
+    def _send_loop(self):
+        while True:
+            timeout = None
+            if self.max_time is not None:
+                t0 = self.t0
+                timeout = self.max_time if t0 is None else max(0, t0 + self.max_time - time.time())
+            try:
+                item = self.send_q.get(timeout=timeout)
+            except queue.Empty:
+                item = self._take_expired()
+                if item is None:
+                    continue
+            if item is None:
+                return
+            try:
+                self.put_func(item)
+            except Exception as e:
+                self.error = e
+                return
+            
+    def _take_expired(self):
+        """
+        remove and return the collected results if the oldest one has been 
+        waiting for max_time seconds, None otherwise
+        """
+        # do not block, put might hold the lock while waiting for the send_q
+        if not self.lock.acquire(False):
+            return None
+        try:
+            if (len(self.items) == 0) or (time.time() - self.t0 < self.max_time):
+                return None
+            items = self.items
+            self._reset()
+            return items
+        finally:
+            self.lock.release()
+    
+    def _send(self, item):
+        if self.error is not None:
+            raise self.error
+        if self.thread is None:
+            self.put_func(item)
+        else:
+            self.send_q.put(item)
+        
+    def put(self, arg, result):
+        if self.max_count == 1:
+            self._send((arg, result))
+            return
+        
+        with self.lock:
+            if len(self.items) == 0:
+                self.t0 = time.time()
+            self.items.append((arg, result))
+            if self.max_bytes is not None:
+                self.nbytes += estimate_size(arg) + estimate_size(result)
+            
+            if ( (len(self.items) >= self.max_count) or
+                 ((self.max_bytes is not None) and (self.nbytes >= self.max_bytes)) or
+                 ((self.max_time is not None) and (time.time() - self.t0 >= self.max_time)) ):
+                self._flush()
+            
+    def _reset(self):
+        self.items = []
+        self.nbytes = 0
+        self.t0 = None
+        
+    def _flush(self):
+        if len(self.items) == 0:
+            return
+        self._send(self.items)
+        # only reset on success, so a failed flush may be repeated
+        self._reset()
+        
+    def flush(self):
+        with self.lock:
+            self._flush()
+        
+    def close(self):
+        """send all collected results and stop the background thread"""
+        self.flush()
+        if self.thread is not None:
+            if self.thread.is_alive():
+                self.send_q.put(None)
+                self.thread.join()
+            if self.error is not None:
+                raise self.error
+
+
+class JobFetcher(object):
+    """
+    provides the arguments to be processed by a worker
+    
+    get returns the next argument. The arguments are fetched in batches of 
+    n_batch items using get_many (i.e. the get_many operation of the job_q).
+    queue.Empty is raised when the job_q was found empty. At most max_jobs
+    arguments are fetched in total (negative: no limit).
+    
+    If prefetch > 0, a background thread does the fetching and tries to keep
+    at least prefetch arguments ready, such that the communication overlaps
+    with the calculation of the worker. An exception raised while fetching
+    is reraised by get once all arguments fetched so far have been returned.
+    
+    stop returns the arguments which have been fetched but not returned by
+    get, so they can be put back to the job_q.
+    """
+    def __init__(self, get_many, n_batch=1, prefetch=0, max_jobs=-1, timeout=0.1):
+        self.get_many = get_many
+        self.n_batch = n_batch
+        self.prefetch = prefetch
+        self.remaining = max_jobs
+        self.timeout = timeout
+        
+        self.ready = collections.deque()
+        self.finished = False
+        self.stopped = False
+        self.error = None
+        self.thread = None
+        if self.prefetch > 0:
+            self.cond = threading.Condition()
+            self.thread = threading.Thread(target=self._fetch_loop)
+            self.thread.daemon = True
+            self.thread.start()
+        
+    def _batch_size(self):
+        n = max(self.n_batch, self.prefetch - len(self.ready))
+        if self.remaining >= 0:
+            n = min(n, self.remaining)
+        return n
+    
+    def _fetch(self, n):
+        args = self.get_many(n, block=True, timeout=self.timeout)
+        if self.remaining >= 0:
+            self.remaining -= len(args)
+        return args
+        
+    def _fetch_loop(self):
+        while True:
+            with self.cond:
+                while (len(self.ready) >= self.prefetch) and not self.stopped:
+                    self.cond.wait()
+                if self.stopped:
+                    return
+                n = self._batch_size()
+            
+            try:
+                if n == 0:
+                    raise queue.Empty
+                args = self._fetch(n)
+            except Exception as e:
+                with self.cond:
+                    if not isinstance(e, queue.Empty):
+                        self.error = e
+                    self.finished = True
+                    self.cond.notify_all()
+                return
+            
+            with self.cond:
+                self.ready.extend(args)
+                self.cond.notify_all()
+        
+    def get(self):
+        if self.thread is None:
+            if len(self.ready) == 0:
+                n = self._batch_size()
+                if n == 0:
+                    raise queue.Empty
+                self.ready.extend(self._fetch(n))
+            return self.ready.popleft()
+        
+        with self.cond:
+            while (len(self.ready) == 0) and not self.finished:
+                self.cond.wait()
+            if len(self.ready) > 0:
+                arg = self.ready.popleft()
+                self.cond.notify_all()
+                return arg
+            if self.error is not None:
+                raise self.error
+            raise queue.Empty
+        
+    def stop(self, timeout=10):
+        """stop fetching and return the arguments not handed out by get"""
+        if self.thread is not None:
+            with self.cond:
+                self.stopped = True
+                self.cond.notify_all()
+            self.thread.join(timeout)
+            with self.cond:
+                args = list(self.ready)
+                self.ready.clear()
+            return args
+        
+        args = list(self.ready)
+        self.ready.clear()
+        return args
+
+
+class SweepArg(tuple):
+    """
+    a point of a ParameterSweep, i.e. the tuple of parameter values
+    
+    The argument is identified by its integer index within the sweep,
+    which also serves as hash value. So it never equals a plain tuple, 
+    even of the same values. If the sweep was given names for
+    its axes, _asdict returns the parameters as dictionary.
+    """
+    def __new__(cls, values, index, names=None):
+        self = tuple.__new__(cls, values)
+        self.index = index
+        self.names = names
+        return self
+    
+    def __reduce__(self):
+        return (SweepArg, (tuple(self), self.index, self.names))
+    
+    def __hash__(self):
+        return self.index
+    
+    def __eq__(self, other):
+        # a tuple of the same values has a different hash
+        if isinstance(other, SweepArg):
+            return self.index == other.index
+        return False
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __repr__(self):
+        return "SweepArg({}, index={})".format(tuple.__repr__(self), self.index)
+    
+    def _asdict(self):
+        if self.names is None:
+            raise AttributeError("the ParameterSweep has no names for its axes")
+        return dict(zip(self.names, self))
+
+
+class ParameterSweep(object):
+    """
+    the Cartesian product of some parameter ranges (axes) as job source
+    
+    The points of the grid are enumerated by an integer index (the last 
+    axis varies fastest) and only decoded to the actual argument (see 
+    SweepArg) when needed, e.g.
+    
+        sweep = ParameterSweep(np.linspace(0, 1, 1000), range(1000))
+        server.args_from_iter(sweep)
+    
+    lets the server process one million points without materializing them.
+    Given a ParameterSweep, args_from_iter tracks the pending arguments 
+    by their index in a bitmap (see IndexSet) instead of the args_set. 
+    
+    names [list of strings] - optional names of the axes, the argument's
+    _asdict method then returns {name: value}
+    """
+    def __init__(self, *axes, **kwargs):
+        names = kwargs.pop('names', None)
+        if len(kwargs) > 0:
+            raise TypeError("unexpected keyword arguments {}".format(list(kwargs.keys())))
+        if len(axes) == 0:
+            raise ValueError("at least one axis is needed")
+        if (names is not None) and (len(names) != len(axes)):
+            raise ValueError("number of names ({}) does not match number of axes ({})".format(len(names), len(axes)))
+        
+        self.axes = [np.asarray(a) for a in axes]
+        self.names = None if names is None else tuple(names)
+        self.shape = tuple(len(a) for a in self.axes)
+        
+    def __len__(self):
+        return int(np.prod(self.shape))
+    
+    def __getitem__(self, index):
+        if not (0 <= index < len(self)):
+            raise IndexError("index {} out of range for sweep of size {}".format(index, len(self)))
+        idx = np.unravel_index(index, self.shape)
+        return SweepArg([a[i] for a, i in zip(self.axes, idx)], int(index), self.names)
+    
+    def __iter__(self):
+        return SweepIterator(self)
+    
+
+class SweepIterator(object):
+    """
+    iterates over the points of a ParameterSweep
+    
+    Since it only stores the next index, it can be pickled, e.g. when
+    the server dumps its state while the sweep is not finished.
+    """
+    def __init__(self, sweep, start=0):
+        self.sweep = sweep
+        self.next_index = start
+        
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self.next_index >= len(self.sweep):
+            raise StopIteration
+        arg = self.sweep[self.next_index]
+        self.next_index += 1
+        return arg
+    
+    next = __next__     # Python 2
+    
+
+class IndexSet(object):
+    """
+    a set of SweepArg items of a certain ParameterSweep, stored as bitmap
+    of their indices
+    
+    It provides the set operations needed for the args_set of the
+    JobManager_Server and needs one bit per point of the sweep.
+    """
+    def __init__(self, sweep):
+        self.sweep = sweep
+        self.bits = np.zeros((len(sweep) + 7) // 8, dtype=np.uint8)
+        self.len = 0
+        
+    def _check(self, arg):
+        if not isinstance(arg, SweepArg):
+            raise TypeError("IndexSet can only hold SweepArg items (got '{}')".format(type(arg)))
+        return arg.index >> 3, np.uint8(0x80 >> (arg.index & 7))
+    
+    def __contains__(self, arg):
+        if not isinstance(arg, SweepArg):
+            return False
+        i, b = self._check(arg)
+        return bool(self.bits[i] & b)
+        
+    def add(self, arg):
+        i, b = self._check(arg)
+        if not (self.bits[i] & b):
+            self.bits[i] |= b
+            self.len += 1
+            
+    def discard(self, arg):
+        i, b = self._check(arg)
+        if self.bits[i] & b:
+            self.bits[i] &= ~b
+            self.len -= 1
+            
+    def remove(self, arg):
+        if arg not in self:
+            raise KeyError(arg)
+        self.discard(arg)
+        
+    def __len__(self):
+        return self.len
+    
+    def __iter__(self):
+        indices = np.flatnonzero(np.unpackbits(self.bits)[:len(self.sweep)])
+        for index in indices:
+            yield self.sweep[index]
+            
+    def __sub__(self, other):
+        return {arg for arg in self if arg not in other}
+    
+    def __eq__(self, other):
+        if isinstance(other, IndexSet):
+            return (self.len == other.len) and set(self) == set(other)
+        return set(self) == other
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class hashDict(dict):
+    """a dict which can be used as argument (it is hashable)
+    
+    The hash is computed once from the items and cached. Any modification
+    of the dict invalidates the cached hash. The hash is not pickled,
+    because the hash of str is seeded differently in each python session.
+    """
+    def _invalidate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self.__dict__.pop('_hash', None)
+            return method(self, *args, **kwargs)
+        return wrapper
+    
+    __setitem__ = _invalidate(dict.__setitem__)
+    __delitem__ = _invalidate(dict.__delitem__)
+    clear       = _invalidate(dict.clear)
+    pop         = _invalidate(dict.pop)
+    popitem     = _invalidate(dict.popitem)
+    setdefault  = _invalidate(dict.setdefault)
+    update      = _invalidate(dict.update)
+    if hasattr(dict, '__ior__'):
+        # d |= other, python >= 3.9
+        __ior__ = _invalidate(dict.__ior__)
+    del _invalidate
+    
     def __hash__(self):
         try:
-            return hash(tuple(sorted(self.items())))
+            return self.__dict__['_hash']
+        except KeyError:
+            pass
+        try:
+            h = hash(frozenset(self.items()))
         except:
             for i in self.items():
                 try:
@@ -1278,22 +2945,72 @@ class hashDict(dict):
                 except Exception as e:
                     print("item '{}' of dict is not hashable".format(i))
                     raise e
+            raise
+        self.__dict__['_hash'] = h
+        return h
+    
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
                     
     
 class hashableCopyOfNumpyArray(np.ndarray):
+    """a read only copy of a numpy array which can be used as argument (it is hashable)
+    
+    Two arrays with equal shape and elements have the same hash, regardless
+    of their dtype (e.g. np.ones(4) and np.ones(4, dtype=np.int32)). 
+    Therefore the hash is computed from the raw buffer of the elements 
+    converted to float64 (complex128 if there are complex elements with 
+    nonzero imaginary part). It is computed once and cached.
+    """
     def __new__(self, other):
         return np.ndarray.__new__(self, shape=other.shape, dtype=other.dtype)
 
     def __init__(self, other):
         self[:] = other[:]
+        # the cached hash would be wrong after a modification 
+        self.flags.writeable = False
     
     def __hash__(self):
-        return hash(self.shape + tuple(self.flat))
+        try:
+            return self.__dict__['_hash']
+        except KeyError:
+            pass
+        a = np.asarray(self)
+        if a.dtype.kind in 'biuf':
+            # adding 0. maps -0. to 0., which compare equal
+            canonical = np.add(a, 0., dtype=np.float64)
+        elif (a.dtype.kind == 'c') and np.any(a.imag != 0):
+            canonical = np.add(a, 0., dtype=np.complex128)
+        elif a.dtype.kind == 'c':
+            canonical = np.add(a.real, 0., dtype=np.float64)
+        else:
+            # e.g. object or string arrays, no raw buffer to use
+            h = hash(self.shape + tuple(self.flat))
+            self.__dict__['_hash'] = h
+            return h
+        
+        h = hash((self.shape, canonical.dtype.kind, np.ascontiguousarray(canonical).tobytes()))
+        self.__dict__['_hash'] = h
+        return h
 
     def __eq__(self, other):
         return np.all(np.equal(self, other))
 
 
+def wait_for_queues(queues, timeout=None):
+    """wait until at least one of the multiprocessing.Queues queues has data
+    available, return the list of those queues
+    
+    Only the process which reads from the queues may use this function.
+    """
+    if mp_connection_wait is None:
+        # Python 2, wait on the first queue only
+        if queues[0]._reader.poll(timeout):
+            return [queues[0]]
+        return [q for q in queues[1:] if q._reader.poll(0)]
+    ready = mp_connection_wait([q._reader for q in queues], timeout)
+    return [q for q in queues if q._reader in ready]
+
 def address_authkey_from_proxy(proxy):
     return list(proxy._address_to_local.keys())[0], proxy._authkey.decode()
 
@@ -1397,6 +3114,22 @@ def copyQueueToList(q):
     return res_q, res_list
 
 
+def estimate_size(obj):
+    """returns a rough estimate of the memory (in bytes) occupied by obj
+    
+    numpy arrays contribute their nbytes, for lists, tuples and dicts
+    the items are taken into account recursively.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(o) for o in obj)
+    elif isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    else:
+        return sys.getsizeof(obj)
+
+
 def getCountKwargs(func):
     """ Returns a list ["count kwarg", "count_max kwarg"] for a
     given function. Valid combinations are defined in 
@@ -1602,6 +3335,23 @@ def setup_SIG_handler_manager():
     Signal_to_SIG_IGN(signals=[signal.SIGINT, signal.SIGTERM], verbose=0)
             
 
+def traceback_with_signature(err, val, trb, max_length=10000):
+    """
+    return (signature, text) for the exception err with value val and 
+    traceback trb, as returned by sys.exc_info()
+    
+    The signature is a short hex string, equal for exceptions of the same
+    type raised through the same stack of (file, function, line). The text
+    is the formatted traceback. If longer than max_length characters, only
+    its end is kept (innermost frames and the exception message).
+    """
+    frames = [(f[0], f[1], f[2]) for f in traceback.extract_tb(trb)]
+    signature = hashlib.md5(repr((err.__name__, frames)).encode('utf8')).hexdigest()[:12]
+    text = "".join(traceback.format_exception(err, val, trb))
+    if len(text) > max_length:
+        text = "[... truncated ...]\n" + text[-max_length:]
+    return signature, text
+
 def try_pickle(obj, show_exception=False):
     blackhole = open(os.devnull, 'wb')
     try:
@@ -363,12 +363,9 @@ class PersistentDataStructure(object):
     # implements the iterator
     def __iter__(self):
         self.need_open()
-        db_iter = self.db.__iter__()
-        while True:
-            next_item = db_iter.__next__()
-            while next_item in RESERVED_KEYS: 
-                next_item = db_iter.__next__()
-            yield next_item 
+        for next_item in self.db:
+            if next_item not in RESERVED_KEYS:
+                yield next_item 
     
     # implements the 'in' statement 
     def __contains__(self, key):
@@ -87,10 +87,10 @@ class PersistentData_Server(JobManager_Server):
     def process_new_result(self, arg, result):
         self.pds[data_as_binary_key(arg.id)] = (arg, result)
         
-    def put_arg(self, a):
+    def put_arg(self, a, priority=0):
         a_bin = data_as_binary_key(a.id)
         if self.overwrite or (not a_bin in self.pds):
-            JobManager_Server.put_arg(self, a)
+            JobManager_Server.put_arg(self, a, priority=priority)
             return True
         
         return False
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Result sinks stream the results received by a JobManager_Server to disk
+while the server is running, so the results do not pile up in memory.
+
+    with ResultSink_X(...) as sink:
+        with JobManager_Server(authkey, result_sink=sink) as server:
+            server.args_from_list(args)
+            server.start()
+
+        for arg, result in sink.items():
+            ...
+
+The server passes each (arg, result) pair to sink.put (see
+JobManager_Server.process_new_result), calls sink.flush before
+process_final_result and sink.close on shutdown.
+"""
+from __future__ import division, print_function
+
+import numbers
+import numpy as np
+import os
+import pickle
+import re
+import sqlite3
+
+from .servers import data_as_binary_key
+
+__all__ = ["ResultSink", "NpzChunkSink", "SqliteSink", "PersistentDataSink"]
+
+
+class ResultSink(object):
+    """base class for result sinks
+
+    subclasses implement put and items, and if the data is buffered,
+    flush and close
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def put(self, arg, result):
+        """store the result for the argument arg"""
+        raise NotImplementedError
+
+    def flush(self):
+        """write buffered results"""
+        pass
+
+    def close(self):
+        """write buffered results and release the resources,
+        put must not be called afterwards
+        """
+        self.flush()
+
+    def items(self):
+        """iterate over all stored (arg, result) pairs"""
+        raise NotImplementedError
+
+
+class NpzChunkSink(ResultSink):
+    """write the results in chunks of chunk_size to the .npz files
+
+        <fname_prefix>_000000.npz, <fname_prefix>_000001.npz, ...
+
+    Each file holds the array 'results' and the array 'args'. If the results
+    of a chunk are all numpy arrays of the same shape and dtype, or all scalars
+    of the same type, they are stacked to a single array. Any other results 
+    (e.g. tuples) are stored as array of objects (pickled), so items returns
+    them unchanged. The args are always stored as array of objects.
+
+    Existing chunk files are kept, new chunks are numbered after them.
+    """
+    def __init__(self, fname_prefix, chunk_size=1000):
+        """
+        fname_prefix [string] - path and beginning of the file names of the chunks
+
+        chunk_size [int] - number of results held in memory before a chunk is written
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1 (got {})".format(chunk_size))
+        self.fname_prefix = fname_prefix
+        self.chunk_size = chunk_size
+        self._args = []
+        self._results = []
+        self._nchunk = len(self.chunk_files())
+
+    def chunk_files(self):
+        """sorted list of the chunk files written so far"""
+        path, prefix = os.path.split(self.fname_prefix)
+        pattern = re.compile(re.escape(prefix) + r"_[0-9]{6}\.npz$")
+        return sorted(os.path.join(path, f) for f in os.listdir(path or '.') if pattern.match(f))
+
+    @staticmethod
+    def _object_array(items):
+        a = np.empty(len(items), dtype=object)
+        for i, item in enumerate(items):
+            a[i] = item
+        return a
+
+    @staticmethod
+    def _stackable(results):
+        """True if the results are arrays of equal shape and dtype, or scalars of equal type"""
+        r0 = results[0]
+        if isinstance(r0, np.ndarray):
+            return (r0.dtype != object) and all(isinstance(r, np.ndarray) and 
+                                                (r.shape == r0.shape) and 
+                                                (r.dtype == r0.dtype) for r in results)
+        if isinstance(r0, (numbers.Number, np.generic)):
+            return all(type(r) is type(r0) for r in results)
+        return False
+
+    def put(self, arg, result):
+        self._args.append(arg)
+        self._results.append(result)
+        if len(self._args) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._args) == 0:
+            return
+        if self._stackable(self._results):
+            results = np.asarray(self._results)
+        else:
+            results = self._object_array(self._results)
+
+        fname = "{}_{:06d}.npz".format(self.fname_prefix, self._nchunk)
+        np.savez(fname, args=self._object_array(self._args), results=results)
+        self._nchunk += 1
+        self._args = []
+        self._results = []
+
+    def items(self):
+        for fname in self.chunk_files():
+            with np.load(fname, allow_pickle=True) as data:
+                args = data['args']
+                results = data['results']
+            for i in range(len(args)):
+                yield args[i], results[i]
+        for i in range(len(self._args)):
+            yield self._args[i], self._results[i]
+
+
+class SqliteSink(ResultSink):
+    """store the results in the sqlite table 'table' of the file fname
+
+    arg and result are pickled, so there is one row per result. The
+    rows are committed every commit_every results.
+    """
+    def __init__(self, fname, table='results', commit_every=1000):
+        """
+        fname [string] - name of the sqlite data base file
+
+        table [string] - name of the table
+
+        commit_every [int] - number of results after which the transaction is committed
+        """
+        if commit_every < 1:
+            raise ValueError("commit_every must be >= 1 (got {})".format(commit_every))
+        self.fname = fname
+        self.table = table
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._con = sqlite3.connect(fname, check_same_thread=False)
+        self._con.execute('CREATE TABLE IF NOT EXISTS "{}" (arg BLOB, result BLOB)'.format(table))
+        self._con.commit()
+
+    def put(self, arg, result):
+        self._con.execute('INSERT INTO "{}" VALUES (?, ?)'.format(self.table),
+                          (pickle.dumps(arg, protocol=pickle.HIGHEST_PROTOCOL),
+                           pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)))
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        if self._con is not None:
+            self._con.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        if self._con is not None:
+            self.flush()
+            self._con.close()
+            self._con = None
+
+    def __len__(self):
+        con = sqlite3.connect(self.fname)
+        try:
+            return con.execute('SELECT COUNT(*) FROM "{}"'.format(self.table)).fetchone()[0]
+        finally:
+            con.close()
+
+    def items(self):
+        self.flush()
+        con = sqlite3.connect(self.fname)
+        try:
+            for arg, result in con.execute('SELECT arg, result FROM "{}" ORDER BY rowid'.format(self.table)):
+                yield pickle.loads(arg), pickle.loads(result)
+        finally:
+            con.close()
+
+
+class PersistentDataSink(ResultSink):
+    """store the results in a PersistentDataStructure (see persistentData)
+
+    The pair (arg, result) is stored with the key key(arg), by default the
+    pickled arg (see servers.data_as_binary_key). The PersistentDataStructure
+    commits each item, so flush is not needed. It is not closed by the sink.
+    """
+    def __init__(self, pds, key=data_as_binary_key):
+        """
+        pds [PersistentDataStructure] - an open PersistentDataStructure
+
+        key [callable] - maps arg to the binary key
+        """
+        self.pds = pds
+        self.key = key
+
+    def put(self, arg, result):
+        self.pds[self.key(arg)] = (arg, result)
+
+    def items(self):
+        for k in self.pds:
+            if not self.pds.is_subdata(k):
+                yield self.pds[k]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+simple timing of the hot paths of the JobManager_Server bookkeeping
+
+    python benchmarks.py
+
+(not collected by the test runner)
+"""
+from __future__ import division, print_function
+
+import numpy as np
+import pickle
+import sys
+import time
+from os.path import abspath, dirname, split
+
+# Add parent directory to beginning of path variable
+sys.path = [split(dirname(abspath(__file__)))[0]] + sys.path
+
+import jobmanager
+
+def timeit(func, repeat=3):
+    t = []
+    for i in range(repeat):
+        t0 = time.time()
+        func()
+        t.append(time.time() - t0)
+    return min(t)
+
+def bench_args(name, args):
+    """time put_arg for args, and the bookkeeping of the results, i.e.
+    removing the (unpickled) args from args_set
+    """
+    server = [None]
+    returned = []
+
+    def put():
+        server[0] = jobmanager.JobManager_Server(authkey='bench', verbose=0, fname_dump=None)
+        server[0].args_from_list(args)
+
+    def bookkeeping():
+        args_set = set(server[0].args_set)
+        for a in returned:
+            args_set.remove(a)
+
+    t_put = timeit(put)
+    # what comes back from the clients
+    returned = [pickle.loads(pickle.dumps(a, protocol=pickle.HIGHEST_PROTOCOL)) for a in server[0].args_set]
+    t_book = timeit(bookkeeping)
+    print("{:<35} put_arg {:8.2f}ms   bookkeeping {:8.2f}ms".format(name, 1000*t_put, 1000*t_book))
+
+if __name__ == "__main__":
+    n = 200
+    bench_args("{} arrays of 10^5 float64".format(n),
+               [np.random.rand(100000) for i in range(n)])
+    bench_args("{} arrays of 10^3 float64".format(n*10),
+               [np.random.rand(1000) for i in range(n*10)])
+    bench_args("{} dicts with 1000 items".format(n*10),
+               [{'k{}'.format(j): i*j for j in range(1000)} for i in range(n*10)])
@@ -11,6 +11,7 @@ import numpy as np
 import traceback
 import socket
 import subprocess
+import pickle
 import signal
 
 from os.path import abspath, dirname, split
@@ -128,14 +129,15 @@ def test_Signal_to_terminate_process_list():
     
 
  
-def start_server(n, read_old_state=False, verbose=1):
+def start_server(n, read_old_state=False, verbose=1, **kwargs):
     print("START SERVER")
     args = range(1,n)
     with jobmanager.JobManager_Server(authkey      = AUTHKEY,
                                       port         = PORT,
                                       verbose      = verbose,
                                       msg_interval = 1,
-                                      fname_dump   = 'jobmanager.dump') as jm_server:
+                                      fname_dump   = 'jobmanager.dump',
+                                      **kwargs) as jm_server:
         if not read_old_state:
             jm_server.args_from_list(args)
         else:
@@ -381,6 +383,63 @@ def shutdown_client(sig):
     assert len(intersect) == 0, "final result does not contain all arguments!"
     print("[+] all arguments found in final_results")
 
+def test_lease_timeout():
+    """
+    start server with leases enabled
+    
+    start client, kill the client and its workers (SIGKILL), so they
+    can not put back their current arguments
+    
+    wait for the leases to expire, start client again
+    
+    if server does not terminate on time, the args of the killed workers
+    have not been put back to the job_q
+    """
+    import psutil
+    
+    global PORT
+    PORT += 1
+    n = 100
+    
+    p_server = mp.Process(target=start_server, args=(n,), kwargs={'lease_timeout': 2})
+    p_server.start()
+    
+    time.sleep(1)
+    
+    p_client = mp.Process(target=start_client)
+    p_client.start()
+    
+    time.sleep(2)
+    
+    procs = psutil.Process(p_client.pid).children(recursive=True)
+    procs.append(psutil.Process(p_client.pid))
+    for proc in procs:
+        proc.kill()
+    p_client.join(5)
+    assert not p_client.is_alive()
+    print("[+] client killed")
+    
+    time.sleep(4)
+    
+    p_client = mp.Process(target=start_client)
+    p_client.start()
+    
+    p_client.join(30)
+    p_server.join(30)
+    
+    assert not p_client.is_alive(), "the client did not terminate on time!"
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    print("[+] client and server terminated")
+    
+    fname = 'jobmanager.dump'
+    with open(fname, 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load(f)
+    
+    assert len(data['args_set']) == 0
+    final_res_args_set = {a[0] for a in data['final_result']}
+    assert final_res_args_set == set(range(1,n)), "final result does not contain all arguments!"
+    print("[+] all arguments found in final_results")
+
 def test_check_fail():
     global PORT
     PORT += 1
@@ -397,7 +456,8 @@ def test_check_fail():
     
     n = 100
     verbose=2
-    p_server = mp.Process(target=start_server, args=(n,))
+    fname_failure_log = 'jobmanager.failures'
+    p_server = mp.Process(target=start_server, args=(n,), kwargs={'fname_failure_log': fname_failure_log})
     p_server.start()
     
     time.sleep(1)
@@ -448,6 +508,16 @@ def test_check_fail():
     
     assert len(set_ref - all_set) == 0, "final result union with reported failure do not correspond to all args!" 
     print("[+] all argumsents found in final_results | reported failure")
+    
+    # all failures were raised at the same place, so there is a single traceback
+    assert len(data['fail_list'][0]) == 4
+    assert len({f[3] for f in data['fail_list']}) == 1
+    with open(fname_failure_log) as f:
+        log = f.read()
+    os.remove(fname_failure_log)
+    assert log.count("RuntimeError: fail_on Error") == 1
+    assert "   RuntimeError   5   " in log
+    print("[+] a single traceback found in the failure log")
 
 def test_jobmanager_read_old_stat():
     """
@@ -508,6 +578,68 @@ def test_jobmanager_read_old_stat():
     assert len(intersect) == 0, "final result does not contain all arguments!"
     print("[+] all arguments found in final_results")    
     
+def test_jobmanager_journal():
+    """
+    start server with journal, start client, process trivial jobs,
+    interrupt in between, remove the dump, replay the journal, finish.
+    
+    check if all arguments are found in the journal
+    """
+    global PORT
+    PORT += 1
+    n = 100
+    fname_journal = 'jobmanager.journal'
+    p_server = mp.Process(target=start_server, args=(n,), kwargs={'fname_journal': fname_journal})
+    p_server.start()
+    
+    time.sleep(1)
+     
+    p_client = mp.Process(target=start_client)
+    p_client.start()
+    
+    time.sleep(3)
+    
+    p_server.terminate()
+     
+    p_client.join(10)
+    p_server.join(10)
+ 
+    assert not p_client.is_alive(), "the client did not terminate on time!"
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    print("[+] client and server terminated")
+    
+    # only the journal is left, and its last record got corrupted
+    os.remove('jobmanager.dump')
+    with open(fname_journal, 'ab') as f:
+        f.write(pickle.dumps(('result', 1, 'incomplete'))[:-3])
+    with open(fname_journal, 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load_journal(f)
+    assert data['numjobs'] == n - 1
+    assert len(data['args_set']) == n - 1 - len(list(jobmanager.JobManager_Server.iter_journal(fname_journal)))
+    print("[+] journal replayed")
+    
+    time.sleep(2)
+    PORT += 1
+    p_server = mp.Process(target=start_server, args=(n,True), kwargs={'fname_journal': fname_journal})
+    p_server.start()
+    
+    time.sleep(2)
+     
+    p_client = mp.Process(target=start_client)
+    p_client.start()
+
+    p_client.join(30)
+    p_server.join(30)
+ 
+    assert not p_client.is_alive(), "the client did not terminate on time!"
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    print("[+] client and server terminated")    
+     
+    journal_args = [a for a, r in jobmanager.JobManager_Server.iter_journal(fname_journal)]
+    assert len(journal_args) == n - 1, "some results are missing or found twice in the journal!" 
+    assert set(journal_args) == set(range(1,n)), "journal does not contain all arguments!"
+    print("[+] all arguments found in the journal")    
+    
 def test_hashDict():
     s = set()
     
@@ -530,6 +662,24 @@ def test_hashDict():
     d3['c'] = 0
     assert not d3 in s
     
+    # the cached hash is updated on modification
+    del d3['c']
+    assert d3 in s
+    d3.update(c=0)
+    assert not d3 in s
+    d3.pop('c')
+    assert d3 in s
+    if sys.version_info >= (3, 9):
+        d3 |= {'c': 0}
+        assert not d3 in s
+        assert hash(d3) == hash(jobmanager.hashDict(d3))
+        d3.pop('c')
+    
+    # the cached hash is not pickled
+    d4 = pickle.loads(pickle.dumps(d3))
+    assert '_hash' not in d4.__dict__
+    assert d4 in s
+    
 def test_hashedViewOnNumpyArray():
     s = set()
     
@@ -564,6 +714,23 @@ def test_hashedViewOnNumpyArray():
     # just some redundant back conversion an checking  
     bh2 = bh2.reshape((4,))
     assert bh2 in s
+    
+    # the copy is read only, as the hash is cached
+    try:
+        bh[0] = 2
+    except ValueError:
+        pass
+    else:
+        assert False, "hashableCopyOfNumpyArray is not read only"
+        
+    # equal elements, equal hash
+    assert hash(jobmanager.hashableCopyOfNumpyArray(np.array([0., 1.]))) == \
+           hash(jobmanager.hashableCopyOfNumpyArray(np.array([-0., 1.])))
+    assert hash(jobmanager.hashableCopyOfNumpyArray(np.ones(4, dtype=np.complex128))) == hash(ah)
+    assert hash(jobmanager.hashableCopyOfNumpyArray(np.ones(4) + 1j)) != hash(ah)
+    
+    # survives pickling
+    assert pickle.loads(pickle.dumps(ah)) in s
 
 def test_client_status():
     global PORT
@@ -604,6 +771,571 @@ def test_jobmanager_local():
         jm_server.args_from_list(args)
         jm_server.start()
         
+def test_jobmanager_batch_size():
+    """
+    let the clients fetch the arguments in batches (fixed size and adaptive)
+    
+    check if all arguments are found in final_result
+    """
+    global PORT
+    n = 100
+    for batch_size in [7, 'auto']:
+        PORT += 1
+        with jobmanager.JobManager_Local(client_class = jobmanager.JobManager_Client,
+                                         authkey = AUTHKEY,
+                                         port = PORT,
+                                         nproc = 2,
+                                         verbose = 1,
+                                         verbose_client = 0,
+                                         fname_dump = None,
+                                         batch_size = batch_size) as jm_server:
+            jm_server.args_from_list(range(1,n))
+            jm_server.start()
+        
+        final_res_args_set = {a[0] for a in jm_server.final_result}
+        assert final_res_args_set == set(range(1,n)), "final result does not contain all arguments!"
+        print("[+] batch_size {}: all arguments found in final_results".format(batch_size))
+
+def test_jobmanager_args_from_iter():
+    """
+    use a generator as job source which refills the job_q while running
+    
+    check if all arguments are found in final_result
+    """
+    global PORT
+    PORT += 1
+    n = 100
+    
+    def arg_gen():
+        for i in range(1,n):
+            yield i
+    
+    with jobmanager.JobManager_Local(client_class = jobmanager.JobManager_Client,
+                                     authkey = AUTHKEY,
+                                     port = PORT,
+                                     nproc = 2,
+                                     verbose = 1,
+                                     verbose_client = 0,
+                                     fname_dump = None) as jm_server:
+        jm_server.args_from_iter(arg_gen(), high_watermark=10)
+        assert jm_server.numjobs == 10
+        jm_server.start()
+        
+    assert jm_server.job_source is None, "job source not exhausted"
+    assert jm_server.numjobs == n-1
+    final_res_args_set = {a[0] for a in jm_server.final_result}
+    assert final_res_args_set == set(range(1,n)), "final result does not contain all arguments!"
+    print("[+] all arguments found in final_results")
+
+def test_parameter_sweep():
+    sweep = jobmanager.ParameterSweep(np.linspace(0, 1, 5), range(3), names=['x', 'n'])
+    assert len(sweep) == 15
+    
+    arg = sweep[7]
+    assert arg == jobmanager.SweepArg((0.5, 1), 7)
+    assert arg._asdict() == {'x': 0.5, 'n': 1}
+    assert hash(arg) == 7
+    # consistent with the hash, never equal to a plain tuple
+    assert arg != (0.5, 1)
+    assert not ((0.5, 1) == arg)
+    assert pickle.loads(pickle.dumps(arg)) == arg
+    assert pickle.loads(pickle.dumps(arg)).index == 7
+    assert [a.index for a in sweep] == list(range(15))
+    
+    # the iterator can be pickled to resume the sweep
+    it = iter(sweep)
+    next(it)
+    next(it)
+    it2 = pickle.loads(pickle.dumps(it))
+    assert next(it2).index == 2
+    
+    s = jobmanager.IndexSet(sweep)
+    for a in sweep:
+        s.add(a)
+    assert len(s) == 15
+    s.remove(sweep[3])
+    s.discard(sweep[3])
+    assert len(s) == 14
+    assert sweep[3] not in s
+    assert sweep[4] in s
+    assert {a.index for a in s} == set(range(15)) - {3}
+    assert s - {sweep[0], sweep[1]} == set(sweep) - {sweep[0], sweep[1], sweep[3]}
+    try:
+        s.remove(sweep[3])
+    except KeyError:
+        pass
+    else:
+        assert False, "KeyError expected"
+    
+    # one bit per point
+    big_sweep = jobmanager.ParameterSweep(np.arange(1000), np.arange(1000))
+    assert jobmanager.IndexSet(big_sweep).bits.nbytes == 125000
+
+def test_jobmanager_parameter_sweep():
+    """
+    process a ParameterSweep, check if all points are found in final_result
+    """
+    global PORT
+    PORT += 1
+    sweep = jobmanager.ParameterSweep(np.linspace(0, 1, 7), range(5))
+    with jobmanager.JobManager_Local(client_class = jobmanager.JobManager_Client,
+                                     authkey = AUTHKEY,
+                                     port = PORT,
+                                     nproc = 2,
+                                     verbose = 1,
+                                     verbose_client = 0,
+                                     fname_dump = None) as jm_server:
+        jm_server.args_from_iter(sweep, high_watermark=10)
+        assert isinstance(jm_server.args_set, jobmanager.IndexSet)
+        jm_server.start()
+    
+    assert len(jm_server.args_set) == 0
+    assert jm_server.all_done.is_set()
+    assert jm_server.numfailed == 0
+    assert {a[0].index for a in jm_server.final_result} == set(range(len(sweep)))
+    print("[+] all points of the sweep found in final_results")
+
+def test_job_q_get_many():
+    q = jobmanager.JobQueue()
+    for i in range(5):
+        q.put(i)
+    time.sleep(0.1)
+    
+    assert q.get_many(3) == [0, 1, 2]
+    assert q.get_many(3) == [3, 4]
+    try:
+        q.get_many(3, timeout=0.1)
+    except jobmanager.queue.Empty:
+        print("[+] get_many raises queue.Empty on empty queue")
+    else:
+        assert False, "get_many on empty queue did not raise queue.Empty"
+
+def test_job_q_priority():
+    q = jobmanager.JobQueue(lease_timeout=0.5)
+    for i in range(6):
+        q.put(i, priority=i % 3)
+    q.put(6)
+    assert q.qsize() == 7
+    
+    # highest priority first, FIFO for equal priority
+    assert q.get_many(3, owner='a') == [2, 5, 1]
+    assert q.get() == 4
+    
+    # expired leases are put back with their priority
+    time.sleep(0.6)
+    assert sorted(q.requeue_expired()) == [1, 2, 5]
+    assert q.get_many(10) == [2, 5, 1, 0, 3, 6]
+    try:
+        q.get(timeout=0.1)
+    except jobmanager.queue.Empty:
+        pass
+    else:
+        assert False, "get on empty queue did not raise queue.Empty"
+    
+    q.put_many([(7, 0), (8, 1), (9, 0)])
+    assert q.get_many(10) == [8, 7, 9]
+
+def test_jobmanager_priority():
+    """
+    process args with priorities using a single worker, check if the 
+    args are processed in the order of their priority
+    """
+    global PORT
+    PORT += 1
+    n = 20
+    with jobmanager.JobManager_Local(client_class = jobmanager.JobManager_Client,
+                                     authkey = AUTHKEY,
+                                     port = PORT,
+                                     nproc = 1,
+                                     verbose = 1,
+                                     verbose_client = 0,
+                                     fname_dump = None) as jm_server:
+        jm_server.args_from_list(range(n), priority=lambda a: a % 4)
+        jm_server.put_arg(n, priority=10)
+        jm_server.start()
+    
+    order = [a for a, r in jm_server.final_result]
+    assert order == [n] + sorted(range(n), key=lambda a: (-(a % 4), a)), order
+    print("[+] args processed in the order of their priority")
+
+def test_job_q_speculative():
+    q = jobmanager.JobQueue(speculative_copies=1)
+    for i in range(3):
+        q.put(i)
+    assert q.get_many(2, owner='a') == [0, 1]
+    assert q.get_many(2, owner='b') == [2]
+    
+    # queue is empty, hand out duplicates of the oldest args in flight,
+    # but not the ones the owner is working on already
+    assert q.get_many(5, owner='b', block=False) == [0, 1]
+    q.release([0])
+    assert q.get_many(5, owner='c', block=False) == [2]
+    assert q.get_numspeculative() == 3
+    
+    # all args in flight got their duplicate
+    try:
+        q.get_many(5, owner='d', block=False)
+    except jobmanager.queue.Empty:
+        pass
+    else:
+        assert False, "get_many did not raise queue.Empty"
+
+class Client_Slow(jobmanager.JobManager_Client):
+    @staticmethod
+    def func(args, const_args):
+        time.sleep(30)
+        return os.getpid()
+
+class Client_Fast(jobmanager.JobManager_Client):
+    @staticmethod
+    def func(args, const_args):
+        time.sleep(0.1)
+        return os.getpid()
+
+def start_client_class(client_class):
+    client = client_class(server=SERVER, authkey=AUTHKEY, port=PORT, nproc=1, verbose=0)
+    client.start()
+
+def test_jobmanager_speculative():
+    """
+    a slow client holds one arg, the fast client reruns it in tail mode
+    
+    check if the server finishes early and all args are found in final_result
+    """
+    global PORT
+    PORT += 1
+    n = 10
+    p_server = mp.Process(target=start_server, args=(n,), kwargs={'speculative_copies': 1})
+    p_server.start()
+    time.sleep(1)
+    
+    t0 = time.time()
+    p_slow = mp.Process(target=start_client_class, args=(Client_Slow,))
+    p_slow.start()
+    time.sleep(1)
+    p_fast = mp.Process(target=start_client_class, args=(Client_Fast,))
+    p_fast.start()
+    
+    p_server.join(20)
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    print("[+] server done after {:.1f}s".format(time.time() - t0))
+    
+    p_fast.join(10)
+    p_slow.terminate()
+    p_slow.join(10)
+    assert not p_fast.is_alive(), "the fast client did not terminate on time!"
+    
+    with open('jobmanager.dump', 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load(f)
+    final_res_args = [a for a, r in data['final_result']]
+    assert sorted(final_res_args) == list(range(1,n)), "some arguments are missing or found twice in final_result!"
+    # all results come from the single worker of the fast client
+    assert len({r for a, r in data['final_result']}) == 1
+    print("[+] all arguments found in final_results")
+
+def test_retry_policy():
+    rp = jobmanager.RetryPolicy(max_attempts=3, max_attempts_per_error={ValueError: 1, 'MemoryError': 5},
+                                backoff=1, backoff_factor=2)
+    assert rp.retry_delay(0, 'RuntimeError', 'host', 1) == 1
+    assert rp.retry_delay(0, 'RuntimeError', 'host', 2) == 2
+    assert rp.retry_delay(0, 'RuntimeError', 'host', 3) is None
+    assert rp.retry_delay(0, 'ValueError', 'host', 1) is None
+    assert rp.retry_delay(0, 'MemoryError', 'host', 4) == 8
+    assert rp.retry_delay(0, 'MemoryError', 'host', 5) is None
+    
+def test_job_q_avoid_hosts():
+    q = jobmanager.JobQueue()
+    q.HOST_ACTIVE_TIME = 0.5
+    q.DEFERRED_CHECK_TIME = 0.1
+    q.put(0, avoid_hosts=['a'])
+    q.put(1)
+    
+    # no other host around, so host a gets 0 anyway
+    assert q.get_many(5, owner=('a', 1), timeout=0.1) == [0, 1]
+    
+    # host b asks for work
+    try:
+        q.get_many(1, owner=('b', 1), timeout=0.1)
+    except jobmanager.queue.Empty:
+        pass
+    else:
+        assert False, "queue should be empty"
+    
+    q.put(0, avoid_hosts=['a'])
+    q.put(1)
+    assert q.get_many(5, owner=('a', 1), timeout=0.1) == [1]
+    try:
+        q.get_many(5, owner=('a', 1), block=False)
+    except jobmanager.queue.Empty:
+        print("[+] host a does not get arg 0 while host b is active")
+    else:
+        assert False, "host a got arg 0 to avoid"
+    
+    # the avoided item is pending work, a blocking get waits for it 
+    # beyond the timeout until host b is not active anymore
+    t0 = time.time()
+    assert q.get_many(5, owner=('a', 1), timeout=0.1) == [0]
+    assert time.time() - t0 > 0.2
+    print("[+] host a gets arg 0 once host b is gone")
+    
+def test_job_q_delay():
+    q = jobmanager.JobQueue()
+    t0 = time.time()
+    q.put(0, delay=0.3)
+    assert q.qsize() == 1
+    try:
+        q.get_many(1, block=False)
+    except jobmanager.queue.Empty:
+        pass
+    else:
+        assert False, "got the delayed item too early"
+    
+    # the delayed item is pending work, a blocking get waits for it 
+    # beyond the timeout
+    assert q.get_many(1, timeout=0.01) == [0]
+    assert time.time() - t0 >= 0.3
+    
+    # delayed copies of items released meanwhile are dropped
+    q.put(1, delay=0.2)
+    q.release([1])
+    assert q.empty()
+    try:
+        q.get_many(1, timeout=0.3)
+    except jobmanager.queue.Empty:
+        print("[+] delayed copy of a released item dropped")
+    else:
+        assert False, "got the delayed copy of a released item"
+
+class Client_Flaky(jobmanager.JobManager_Client):
+    @staticmethod
+    def func(args, const_args):
+        # the first attempt fails for every arg
+        fname = 'flaky_{}.flag'.format(args)
+        if not os.path.exists(fname):
+            open(fname, 'w').close()
+            raise RuntimeError("transient error")
+        os.remove(fname)
+        return args
+
+def test_jobmanager_retry():
+    """
+    each job fails on its first attempt, check if all of them
+    succeed thanks to the retry policy
+    """
+    global PORT
+    PORT += 1
+    n = 10
+    p_server = mp.Process(target=start_server, args=(n,), 
+                          kwargs={'retry_policy': jobmanager.RetryPolicy(max_attempts=2, backoff=0.1),
+                                  'fname_failure_log': None})
+    p_server.start()
+    time.sleep(1)
+    
+    try:
+        client = Client_Flaky(server=SERVER, authkey=AUTHKEY, port=PORT, nproc=2, verbose=0)
+        client.start()
+        p_server.join(30)
+        assert not p_server.is_alive(), "the server did not terminate on time!"
+    finally:
+        if p_server.is_alive():
+            p_server.terminate()
+        for fname in os.listdir('.'):
+            if fname.startswith('flaky_') and fname.endswith('.flag'):
+                os.remove(fname)
+    
+    with open('jobmanager.dump', 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load(f)
+    assert len(data['fail_set']) == 0
+    assert sorted(a for a, r in data['final_result']) == list(range(1,n))
+    print("[+] all failed jobs succeeded on retry")
+
+def test_jobmanager_result_batching():
+    """
+    let the clients send their results in batches
+    
+    check if all arguments are found in final_result of dump
+    """
+    global PORT
+    PORT += 1
+    n = 100
+    p_server = mp.Process(target=start_server, args=(n,))
+    p_server.start()
+    
+    time.sleep(1)
+    
+    client = jobmanager.JobManager_Client(server             = SERVER, 
+                                          authkey            = AUTHKEY, 
+                                          port               = PORT, 
+                                          nproc              = 2,
+                                          verbose            = 1,
+                                          batch_size         = 4,
+                                          result_batch_size  = 10,
+                                          result_batch_time  = 0.5)
+    client.start()
+    p_server.join(30)
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    
+    fname = 'jobmanager.dump'
+    with open(fname, 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load(f)
+    
+    final_res_args_set = {a[0] for a in data['final_result']}
+    assert final_res_args_set == set(range(1,n)), "final result does not contain all arguments!"
+    print("[+] all arguments found in final_results")
+
+class Prepare_Server(jobmanager.JobManager_Server):
+    @staticmethod
+    def prepare_new_result(arg, result):
+        time.sleep(0.05)
+        return ('prepared', result, os.getpid())
+
+def start_prepare_server(n, **kwargs):
+    args = range(1,n)
+    with Prepare_Server(authkey      = AUTHKEY,
+                        port         = PORT,
+                        verbose      = 1,
+                        msg_interval = 1,
+                        fname_dump   = 'jobmanager.dump',
+                        **kwargs) as jm_server:
+        jm_server.args_from_list(args)
+        jm_server.start()
+
+def test_jobmanager_result_workers():
+    """
+    prepare the results on a pool of threads and on a pool of processes
+    
+    check if all prepared results are found in final_result of dump
+    """
+    global PORT
+    n = 40
+    for kwargs in [{'result_workers': 2, 'result_worker_type': 'thread', 'result_ordered': True},
+                   {'result_workers': 2, 'result_worker_type': 'process', 'result_ordered': False, 
+                    'result_max_pending': 3}]:
+        print(kwargs)
+        PORT += 1
+        p_server = mp.Process(target=start_prepare_server, args=(n,), kwargs=kwargs)
+        p_server.start()
+        
+        time.sleep(1)
+        
+        client = jobmanager.JobManager_Client(server     = SERVER, 
+                                              authkey    = AUTHKEY, 
+                                              port       = PORT, 
+                                              nproc      = 2,
+                                              verbose    = 1,
+                                              batch_size = 4)
+        client.start()
+        p_server.join(30)
+        assert not p_server.is_alive(), "the server did not terminate on time!"
+        
+        with open('jobmanager.dump', 'rb') as f:
+            data = jobmanager.JobManager_Server.static_load(f)
+        
+        assert {a for a, r in data['final_result']} == set(range(1,n)), "final result does not contain all arguments!"
+        assert all(r[0] == 'prepared' for a, r in data['final_result'])
+        pids = {r[2] for a, r in data['final_result']}
+        if kwargs['result_worker_type'] == 'thread':
+            assert pids == {p_server.pid}
+        else:
+            assert p_server.pid not in pids
+        print("[+] all prepared results found in final_results")
+
+def test_result_buffer():
+    sent = []
+    rb = jobmanager.ResultBuffer(put=sent.append, max_count=3)
+    for i in range(4):
+        rb.put(i, i**2)
+    assert sent == [[(0, 0), (1, 1), (2, 4)]]
+    assert len(rb) == 1
+    rb.flush()
+    assert sent[-1] == [(3, 9)]
+    assert len(rb) == 0
+    
+    sent = []
+    rb = jobmanager.ResultBuffer(put=sent.append, max_count=100, max_bytes=1000)
+    rb.put(0, np.zeros(100))
+    assert len(sent) == 0
+    rb.put(1, np.zeros(100))
+    assert len(sent) == 1 and len(sent[0]) == 2
+    
+    sent = []
+    rb = jobmanager.ResultBuffer(put=sent.append, max_count=100, max_time=0.1)
+    rb.put(0, 0)
+    time.sleep(0.15)
+    rb.put(1, 1)
+    assert sent == [[(0, 0), (1, 1)]]
+    
+    # the background thread sends on time, without the next put
+    sent = []
+    rb = jobmanager.ResultBuffer(put=sent.append, max_count=100, max_time=0.1, threaded=True)
+    rb.put(0, 0)
+    time.sleep(0.3)
+    assert sent == [[(0, 0)]]
+    rb.put(1, 1)
+    rb.close()
+    assert sent == [[(0, 0)], [(1, 1)]]
+
+    sent = []
+    rb = jobmanager.ResultBuffer(put=sent.append)
+    rb.put(0, 0)
+    assert sent == [(0, 0)]
+
+def test_jobmanager_prefetch():
+    """
+    let the clients prefetch the arguments and send the results in background
+    
+    check if all arguments are found in final_result of dump
+    """
+    global PORT
+    PORT += 1
+    n = 100
+    p_server = mp.Process(target=start_server, args=(n,))
+    p_server.start()
+    
+    time.sleep(1)
+    
+    client = jobmanager.JobManager_Client(server             = SERVER, 
+                                          authkey            = AUTHKEY, 
+                                          port               = PORT, 
+                                          nproc              = 2,
+                                          verbose            = 1,
+                                          prefetch           = 2,
+                                          result_batch_size  = 5)
+    client.start()
+    p_server.join(30)
+    assert not p_server.is_alive(), "the server did not terminate on time!"
+    
+    fname = 'jobmanager.dump'
+    with open(fname, 'rb') as f:
+        data = jobmanager.JobManager_Server.static_load(f)
+    
+    final_res_args_set = {a[0] for a in data['final_result']}
+    assert final_res_args_set == set(range(1,n)), "final result does not contain all arguments!"
+    print("[+] all arguments found in final_results")
+
+def test_job_fetcher():
+    q = jobmanager.JobQueue()
+    for i in range(10):
+        q.put(i)
+    time.sleep(0.1)
+    
+    # no more than max_jobs arguments are fetched
+    jf = jobmanager.JobFetcher(get_many=q.get_many, n_batch=3, prefetch=2, max_jobs=8)
+    args = []
+    try:
+        while True:
+            args.append(jf.get())
+    except jobmanager.queue.Empty:
+        pass
+    assert args == list(range(8))
+    assert jf.stop() == []
+    
+    # prefetched arguments are returned by stop
+    jf = jobmanager.JobFetcher(get_many=q.get_many, n_batch=1, prefetch=2)
+    assert jf.get() == 8
+    time.sleep(0.2)
+    assert jf.stop() == [9]
+
 def test_start_server_on_used_port():
     global PORT
     PORT += 1
@@ -861,12 +1593,32 @@ if __name__ == "__main__":
 #         test_jobmanager_server_signals,
 #         test_shutdown_server_while_client_running,
 #         test_shutdown_client,
+#         test_lease_timeout,
 #         test_check_fail,
 #         test_jobmanager_read_old_stat,
+#         test_jobmanager_journal,
 #         test_hashDict,
 #         test_hashedViewOnNumpyArray,
 #         test_client_status,
 #         test_jobmanager_local,
+#         test_jobmanager_batch_size,
+#         test_jobmanager_args_from_iter,
+#         test_parameter_sweep,
+#         test_jobmanager_parameter_sweep,
+#         test_job_q_get_many,
+#         test_job_q_priority,
+#         test_jobmanager_priority,
+#         test_job_q_speculative,
+#         test_jobmanager_speculative,
+#         test_retry_policy,
+#         test_job_q_avoid_hosts,
+#         test_job_q_delay,
+#         test_jobmanager_retry,
+#         test_jobmanager_result_batching,
+#         test_jobmanager_result_workers,
+#         test_result_buffer,
+#         test_jobmanager_prefetch,
+#         test_job_fetcher,
 #         test_start_server_on_used_port,
 #         test_shared_const_arg,
 #         test_digest_rejected,
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import division, print_function
+
+import numpy as np
+import os
+import sys
+import time
+from os.path import abspath, dirname, split
+
+# Add parent directory to beginning of path variable
+sys.path = [split(dirname(abspath(__file__)))[0]] + sys.path
+
+import jobmanager
+from jobmanager import sinks
+
+AUTHKEY = 'testing'
+PORT = 42724
+
+def test_npz_chunk_sink():
+    prefix = 'test_npz_sink'
+    with sinks.NpzChunkSink(prefix, chunk_size=4) as sink:
+        for i in range(10):
+            sink.put(i, np.ones(3)*i)
+        assert len(sink.chunk_files()) == 2
+        # the last two results are still buffered but found by items
+        assert len(list(sink.items())) == 10
+
+    fnames = sinks.NpzChunkSink(prefix).chunk_files()
+    try:
+        assert len(fnames) == 3
+        with np.load(fnames[0]) as data:
+            assert data['results'].dtype == np.float64
+            assert data['results'].shape == (4, 3)
+
+        # ragged results are stored as objects, new chunks are appended
+        with sinks.NpzChunkSink(prefix) as sink:
+            sink.put((1, 'a'), [1, 2])
+            sink.put((2, 'b'), [3])
+
+        items = list(sinks.NpzChunkSink(prefix).items())
+        assert len(items) == 12
+        for i in range(10):
+            assert items[i][0] == i
+            assert np.all(items[i][1] == i)
+        assert items[10] == ((1, 'a'), [1, 2])
+        assert items[11] == ((2, 'b'), [3])
+        
+        # tuples of equal length are not stacked, the results come back unchanged
+        with sinks.NpzChunkSink(prefix, chunk_size=2) as sink:
+            sink.put(0, (np.arange(3), np.ones(3, dtype=np.complex128)))
+            sink.put(1, (np.arange(3), np.zeros(3, dtype=np.complex128)))
+        result = list(sinks.NpzChunkSink(prefix).items())[-1][1]
+        assert isinstance(result, tuple)
+        t, x = result
+        assert t.dtype == np.arange(3).dtype
+        assert x.dtype == np.complex128
+    finally:
+        for fname in sinks.NpzChunkSink(prefix).chunk_files():
+            os.remove(fname)
+
+def test_sqlite_sink():
+    fname = 'test_sqlite_sink.db'
+    try:
+        with sinks.SqliteSink(fname, commit_every=3) as sink:
+            for i in range(10):
+                sink.put((i, 'x'), {'r': i**2})
+            assert len(sink) == 9
+
+        sink = sinks.SqliteSink(fname)
+        assert len(sink) == 10
+        for i, (arg, result) in enumerate(sink.items()):
+            assert arg == (i, 'x')
+            assert result == {'r': i**2}
+        sink.close()
+    finally:
+        os.remove(fname)
+
+def test_persistent_data_sink():
+    try:
+        from jobmanager.persistentData import PersistentDataStructure
+    except ImportError as e:
+        print("skip test_persistent_data_sink ({})".format(e))
+        return
+
+    with PersistentDataStructure(name='test_pds_sink', verbose=0) as pds:
+        try:
+            with sinks.PersistentDataSink(pds) as sink:
+                for i in range(5):
+                    sink.put(i, i*0.5)
+                assert sorted(sink.items()) == [(i, i*0.5) for i in range(5)]
+            assert len(pds) == 5
+        finally:
+            pds.erase()
+
+def test_jobmanager_result_sink():
+    """
+    stream the results to a SqliteSink, check if all arguments are found in
+    the sink and final_result stays empty
+    """
+    global PORT
+    PORT += 1
+    fname = 'test_result_sink.db'
+    n = 20
+    try:
+        with sinks.SqliteSink(fname, commit_every=5) as sink:
+            with jobmanager.JobManager_Local(client_class = jobmanager.JobManager_Client,
+                                             authkey = AUTHKEY,
+                                             port = PORT,
+                                             nproc = 2,
+                                             verbose = 1,
+                                             verbose_client = 0,
+                                             fname_dump = None) as jm_server:
+                jm_server.result_sink = sink
+                jm_server.args_from_list(range(n))
+                jm_server.start()
+
+            assert len(jm_server.final_result) == 0
+            assert sorted(arg for arg, result in sink.items()) == list(range(n))
+            print("[+] all arguments found in the result sink")
+    finally:
+        os.remove(fname)
+
+if __name__ == "__main__":
+    test_npz_chunk_sink()
+    test_sqlite_sink()
+    test_persistent_data_sink()
+    test_jobmanager_result_sink()